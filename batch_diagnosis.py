@@ -0,0 +1,132 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from fuzzy_engine import diagnose_batch
+from knowledge_base import add_kb_arguments, load_from_args
+
+# --- 1. Membaca File Pasien per Potongan ---
+def column_dtypes(sample, numeric=()):
+    """
+    Tipe tetap setiap kolom CSV, ditentukan sekali dari potongan pertama agar
+    semua potongan (dan skema Parquet hasil) sama: integer menjadi Int64
+    (sel kosong di potongan berikutnya tidak mengubahnya menjadi float),
+    boolean menjadi boolean, float yang terisi tetap float64, dan sisanya
+    (teks atau kolom yang masih kosong) string. Kolom numeric (gejala) tidak
+    pernah menjadi string: Int64 jika integer, selain itu float64.
+    """
+    dtypes = {}
+    for col, dtype in sample.dtypes.items():
+        if col in numeric:
+            dtypes[col] = "Int64" if pd.api.types.is_integer_dtype(dtype) else "float64"
+        elif pd.api.types.is_bool_dtype(dtype):
+            dtypes[col] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[col] = "Int64"
+        elif pd.api.types.is_float_dtype(dtype) and sample[col].notna().any():
+            dtypes[col] = "float64"
+        else:
+            dtypes[col] = "string"
+    return dtypes
+
+def _arrow_nullable_dtype(arrow_type):
+    """types_mapper Parquet: integer, boolean dan teks memakai dtype nullable pandas, di potongan mana pun."""
+    import pyarrow as pa
+    if pa.types.is_integer(arrow_type):
+        return pd.Int64Dtype()
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype()
+    return None
+
+def read_chunks(path, chunksize, numeric=()):
+    """
+    Membaca file pasien (CSV atau Parquet) sebagai generator DataFrame
+    berisi paling banyak chunksize baris. Tipe kolom sama di semua potongan:
+    untuk Parquet dari skema file, untuk CSV dari potongan pertama (lihat
+    column_dtypes; numeric berisi nama kolom gejala).
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas(types_mapper=_arrow_nullable_dtype)
+    else:
+        dtypes = column_dtypes(pd.read_csv(path, nrows=chunksize), numeric)
+        yield from pd.read_csv(path, chunksize=chunksize, dtype=dtypes)
+
+# --- 2. Skoring per Potongan ---
+def score_chunks(chunks, compiled, output_mf, y_domain, top_n=3):
+    """
+    Menambahkan kolom hasil diagnosis ke setiap potongan:
+    z_star, alpha_<penyakit>, serta top<k>, top<k>_mu dan top<k>_pct.
+    """
+    diseases = np.array(compiled.diseases + [""], dtype=object)
+    for df in chunks:
+        res = diagnose_batch(df, compiled, output_mf, y_domain, top_n=top_n)
+        out = df.copy()
+        out["z_star"] = res.z_star
+        for j, d in enumerate(res.diseases):
+            out[f"alpha_{d}"] = res.alpha[:, j]
+        for k in range(top_n):
+            out[f"top{k + 1}"] = diseases[res.top_index[:, k]]
+            out[f"top{k + 1}_mu"] = res.top_score[:, k]
+            out[f"top{k + 1}_pct"] = res.top_percent[:, k]
+        yield out
+
+# --- 3. Menulis Hasil Secara Bertahap ---
+def write_chunks(chunks, path):
+    """
+    Menulis setiap potongan segera setelah selesai diskor, sehingga
+    memori tetap konstan. Mengembalikan jumlah baris yang ditulis.
+    """
+    rows = 0
+    if path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for df in chunks:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    # Tipe kolom sudah tetap sejak dibaca (lihat read_chunks), jadi skema potongan
+                    # pertama berlaku untuk semua potongan
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                rows += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    out = sys.stdout if path == "-" else open(path, "w", newline="")
+    try:
+        for i, df in enumerate(chunks):
+            df.to_csv(out, header=(i == 0), index=False)
+            rows += len(df)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return rows
+
+# --- 4. Main ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skoring batch file pasien dengan fuzzy inference Mamdani berbobot.")
+    parser.add_argument("input", help="File pasien (.csv atau .parquet) dengan kolom gejala")
+    parser.add_argument("output", help="File hasil (.csv, .parquet, atau - untuk stdout)")
+    parser.add_argument("--chunksize", type=int, default=10000)
+    parser.add_argument("--top-n", type=int, default=3)
+    add_kb_arguments(parser)
+    args = parser.parse_args(argv)
+
+    kb = load_from_args(args)
+
+    chunks = read_chunks(args.input, args.chunksize, numeric=kb.rules.symptoms)
+    scored = score_chunks(chunks, kb.rules, kb.output_mf, kb.y_domain, top_n=args.top_n)
+    rows = write_chunks(scored, args.output)
+    print(f"{rows} baris diskor -> {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from fuzzy_engine import (INSTRUMENTATION, IncrementalInference, aggregate_rows, batch_top, defuzzify_mom_rows, diagnose, diagnose_batch,
+                          disease_strengths, fuzzy_inference_mamdani_weighted, get_top_diagnoses, membership_range,
+                          output_set_curves, rule_strengths, symptom_memberships, top_n_rows)
+from knowledge_base import (add_kb_arguments, export_knowledge_base, load_from_args, load_knowledge_base_csv,
+                            load_membership_functions, load_output_membership)
+
+STAGES = ["load_csv", "fuzzify", "rules", "aggregate", "defuzzify", "top_n", "batch", "single", "incremental"]
+
+# Jalur cold start yang diprofilkan di proses baru: kode, anggaran waktu (ms) dan
+# modul berat yang tidak boleh ikut termuat. KB diganti path artefak biner sementara.
+IMPORT_TARGETS = {
+    "engine": ("import fuzzy_engine, knowledge_base", 150),
+    "engine_kb": ("from knowledge_base import load_knowledge_base_binary\n"
+                  "from fuzzy_engine import diagnose\n"
+                  "kb = load_knowledge_base_binary(KB, lut_step=0.1)\n"
+                  "diagnose({}, kb.rules, kb.output_mf, kb.y_domain)", 200),
+    "cli": ("import cek1, dengan_bobot_new", 200),
+    "streamlit_engine": ("import streamlit_engine", 800),
+}
+HEAVY_MODULES = ("pandas", "matplotlib", "scipy")
+
+# --- 1. Rule Base Sintetis ---
+def write_synthetic_rules(path, n_rules, mf, diseases, seed=0):
+    """
+    Menulis n_rules rule acak dengan format rules_bobot_respirasi.csv.
+    Setiap rule memakai 3–8 gejala berbeda dengan set dan bobot acak,
+    dan penyakitnya diambil bergiliran dari diseases.
+    """
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    symptoms = list(mf)
+    rows = []
+    for r in range(n_rules):
+        k = int(rng.integers(3, min(8, len(symptoms)) + 1))
+        picked = rng.choice(len(symptoms), size=k, replace=False)
+        conds = []
+        for i in picked:
+            sets = list(mf[symptoms[i]])
+            conds.append(f"{symptoms[i]}_{sets[rng.integers(len(sets))]}")
+        weights = np.round(rng.dirichlet(np.ones(k)), 2).tolist()
+        disease = diseases[r % len(diseases)]
+        rows.append({
+            "kategori": "Sintetis",
+            "nama_penyakit": disease,
+            "gejala": str([c.rsplit("_", 1)[0] for c in conds]),
+            "rule": f"IF {' AND '.join(c.replace('_', ' ') for c in conds)} THEN {disease}",
+            "vars": str(conds),
+            "weights": str(weights),
+        })
+    pd.DataFrame(rows).to_csv(path)
+
+def random_inputs(mf, symptoms, n, seed=0):
+    """Array (n, jumlah gejala) nilai acak di semesta tiap gejala, dibulatkan ke 0.1 seperti input UI."""
+    rng = np.random.default_rng(seed)
+    x = np.empty((n, len(symptoms)))
+    for i, g in enumerate(symptoms):
+        lo, hi = membership_range(mf[g])
+        x[:, i] = np.round(rng.uniform(lo, hi, n), 1)
+    return x
+
+# --- 2. Pengukuran ---
+def measure(fn, repeat, warmup=2):
+    """Menjalankan fn sebanyak warmup + repeat kali; mengembalikan durasi (detik) setiap ulangan terukur."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1e9)
+    return samples
+
+def summarize(samples, items):
+    """Persentil latensi (ms) dan throughput (items per detik pada median)."""
+    s = np.asarray(samples)
+    p50, p90, p99 = np.percentile(s, [50, 90, 99])
+    return {
+        "repeat": len(s),
+        "p50_ms": p50 * 1e3,
+        "p90_ms": p90 * 1e3,
+        "p99_ms": p99 * 1e3,
+        "mean_ms": s.mean() * 1e3,
+        "min_ms": s.min() * 1e3,
+        "throughput": items / p50 if p50 > 0 else float("inf"),
+    }
+
+# --- 3. Benchmark per Tahap ---
+def bench_stages(kb, batch, repeat, seed=0):
+    """
+    Mengukur setiap tahap pipeline batch secara terpisah untuk satu ukuran
+    batch. Masukan setiap tahap dihitung sekali dari tahap sebelumnya,
+    sehingga yang terukur hanya tahap itu sendiri.
+    Returns:
+        Dictionary tahap -> ringkasan (lihat summarize)
+    """
+    compiled, y = kb.rules, np.asarray(kb.y_domain, dtype=float)
+    x = random_inputs(kb.mf, compiled.symptoms, batch, seed)
+    names, index, curves = output_set_curves(kb.output_mf, y)
+    curves = curves[[index[d] for d in compiled.diseases]]
+    peaks = curves.max(axis=1)
+
+    mu = symptom_memberships(x, compiled)
+    alpha = disease_strengths(compiled, rule_strengths(compiled, mu))
+    aggregated = aggregate_rows(alpha, curves)
+    scores = np.minimum(alpha, peaks)
+
+    stages = {
+        "fuzzify": lambda: symptom_memberships(x, compiled),
+        "rules": lambda: disease_strengths(compiled, rule_strengths(compiled, mu)),
+        "aggregate": lambda: aggregate_rows(alpha, curves),
+        "defuzzify": lambda: defuzzify_mom_rows(y, aggregated),
+        "top_n": lambda: top_n_rows(scores, 3),
+        "batch": lambda: diagnose_batch(x, compiled, kb.output_mf, y),
+    }
+    if batch == 1:
+        record = dict(zip(compiled.symptoms, x[0]))
+        stages["single"] = lambda: diagnose(record, compiled, kb.output_mf, y)
+        # Satu gejala berganti nilai bolak-balik, lalu hasilnya diambil
+        engine = IncrementalInference(compiled, kb.output_mf, y, inputs=record)
+        nudges = itertools.cycle([random_inputs(kb.mf, compiled.symptoms, 1, seed + 1)[0, 0], x[0, 0]])
+        stages["incremental"] = lambda: (engine.update(compiled.symptoms[0], next(nudges)), engine.result())
+    return {name: summarize(measure(fn, repeat), batch) for name, fn in stages.items()}
+
+def run_benchmarks(sizes, batches, repeat, mf_path, rules_path, output_mf_path, lut_step=0.1, seed=0,
+                   mf_shape="triangle"):
+    """
+    Menjalankan seluruh matriks ukuran rule x ukuran batch.
+    Ukuran 0 berarti knowledge base asli (rules_path); ukuran lain memakai
+    rule sintetis dengan gejala dan penyakit yang sama. Tahap load_csv
+    dicatat dengan batch 0 dan throughput dalam rule per detik.
+    Returns:
+        List Dictionary hasil per (rules, batch, stage)
+    """
+    mf, _ = load_membership_functions(mf_path, mf_shape)
+    diseases = list(load_output_membership(output_mf_path))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = rules_path
+            if size:
+                path = os.path.join(tmp, f"rules_{size}.csv")
+                write_synthetic_rules(path, size, mf, diseases, seed)
+
+            def load():
+                return load_knowledge_base_csv(mf_path, path, output_mf_path, lut_step=lut_step, mf_shape=mf_shape)
+
+            kb = load()
+            n_rules = len(kb.rules.rules)
+            load_repeat = max(3, repeat // 4) if n_rules > 1000 else repeat
+            entries = {(0, "load_csv"): summarize(measure(load, load_repeat, warmup=1), n_rules)}
+            for batch in batches:
+                for stage, summary in bench_stages(kb, batch, repeat, seed).items():
+                    entries[(batch, stage)] = summary
+            for (batch, stage), summary in entries.items():
+                results.append({"rules": n_rules, "batch": batch, "stage": stage, **summary})
+                print(format_row(results[-1]), file=sys.stderr)
+    return results
+
+# --- 4. Laporan dan Perbandingan ---
+def environment():
+    """Metadata lingkungan dan commit agar hasil antar-commit bisa dibandingkan."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+def format_row(r):
+    return (f"rules={r['rules']:>6} batch={r['batch']:>6} {r['stage']:<11} "
+            f"p50={r['p50_ms']:9.3f}ms p90={r['p90_ms']:9.3f}ms p99={r['p99_ms']:9.3f}ms "
+            f"{r['throughput']:12.1f}/s")
+
+def compare(results, baseline):
+    """
+    Membandingkan p50 dengan hasil JSON sebelumnya.
+    Returns:
+        List (rules, batch, stage, p50 lama, p50 baru, rasio baru/lama)
+    """
+    old = {(r["rules"], r["batch"], r["stage"]): r["p50_ms"] for r in baseline["results"]}
+    rows = []
+    for r in results:
+        key = (r["rules"], r["batch"], r["stage"])
+        if key in old and old[key] > 0:
+            rows.append(key + (old[key], r["p50_ms"], r["p50_ms"] / old[key]))
+    return rows
+
+# --- 5. Profil Waktu Impor ---
+_IMPORT_PROBE = """
+import json, sys, time
+sys.path.append({base!r})
+KB = {kb!r}
+start = time.perf_counter()
+exec(compile({code!r}, "<target>", "exec"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1e3, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _run_probe(code, kb_path, importtime=False):
+    base = os.path.dirname(os.path.abspath(__file__))
+    probe = _IMPORT_PROBE.format(base=base, kb=kb_path, code=code, heavy=HEAVY_MODULES)
+    # cwd di luar repo: streamlit.py milik repo tidak boleh membayangi paket streamlit
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", probe]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=tempfile.gettempdir(), check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+def _slowest_imports(importtime_log, top=5):
+    """Modul dengan waktu impor kumulatif terbesar dari keluaran python -X importtime."""
+    rows = []
+    for line in importtime_log.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]) / 1e3, parts[2].strip()))
+    return [{"module": name, "cumulative_ms": ms} for ms, name in sorted(rows, reverse=True)[:top]]
+
+def import_profile(repeat=5, mf_path=None, rules_path=None, output_mf_path=None, budget_scale=1.0,
+                   mf_shape="triangle"):
+    """
+    Mengukur waktu cold start setiap IMPORT_TARGETS di proses Python baru
+    (median dari repeat kali), modul berat yang ikut termuat dan modul
+    terlambat menurut -X importtime.
+    Returns:
+        List Dictionary per target; "ok" False jika melewati anggaran atau memuat modul berat
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        kb_path = os.path.join(tmp, "profile.kb")
+        export_knowledge_base(load_knowledge_base_csv(mf_path, rules_path, output_mf_path, mf_shape=mf_shape), kb_path)
+        for name, (code, budget) in IMPORT_TARGETS.items():
+            samples = [_run_probe(code, kb_path)[0] for _ in range(repeat)]
+            ms = float(np.median([r["ms"] for r in samples]))
+            heavy = sorted({m for r in samples for m in r["heavy"]})
+            _, log = _run_probe(code, kb_path, importtime=True)
+            budget *= budget_scale
+            results.append({"target": name, "ms": ms, "budget_ms": budget, "heavy": heavy,
+                            "slowest": _slowest_imports(log), "ok": ms <= budget and not heavy})
+    return results
+
+def format_import_row(r):
+    flag = "" if r["ok"] else "  <-- melewati anggaran" if not r["heavy"] else f"  <-- memuat {', '.join(r['heavy'])}"
+    slowest = ", ".join(f"{s['module']} {s['cumulative_ms']:.0f}ms" for s in r["slowest"][:3])
+    return f"{r['target']:<17} {r['ms']:8.1f}ms / {r['budget_ms']:6.0f}ms  [{slowest}]{flag}"
+
+# --- 6. Kesesuaian dengan Versi Acuan ---
+def parity_check(kb, n=3000, seed=0, missing=0.2):
+    """
+    Membandingkan jalur cepat (diagnose, diagnose_batch, IncrementalInference)
+    dengan fuzzy_inference_mamdani_weighted + get_top_diagnoses pada n input
+    acak; sebagian gejala sengaja dikosongkan. Hasil harus sama persis:
+    selisih 1 ulp pada alpha bisa memutus seri dan memindahkan z_star.
+    Returns:
+        Dictionary jalur -> jumlah input yang hasilnya berbeda
+    """
+    rng = np.random.default_rng(seed)
+    symptoms = kb.rules.symptoms
+    x = random_inputs(kb.mf, symptoms, n, seed)
+    keep = rng.random(x.shape) >= missing
+    records = [{g: float(v) for g, v, k in zip(symptoms, row, mask) if k} for row, mask in zip(x, keep)]
+    batch = diagnose_batch(records, kb.rules, kb.output_mf, kb.y_domain)
+    engine = IncrementalInference(kb.rules, kb.output_mf, kb.y_domain)
+    mismatches = {"single": 0, "batch": 0, "incremental": 0}
+    for i, r in enumerate(records):
+        z_ref, per_disease, _ = fuzzy_inference_mamdani_weighted(r, kb.mf, kb.rules.rules, kb.output_mf, kb.y_domain)
+        expected = (z_ref, get_top_diagnoses(per_disease, kb.y_domain))
+        engine.reset(r)
+        got = {"single": diagnose(r, kb.rules, kb.output_mf, kb.y_domain),
+               "batch": (batch.z_star[i], batch_top(batch, i)),
+               "incremental": engine.result()}
+        for path, result in got.items():
+            mismatches[path] += result != expected
+    return mismatches
+
+def update_walk(kb, steps=3000, seed=0):
+    """
+    Jalan acak IncrementalInference.update: setiap langkah mengubah satu
+    gejala menjadi None, nilai di grid 0.1, nilai di luar grid, atau nilai
+    di luar semesta, lalu membandingkan engine.result() dengan
+    diagnose(engine.inputs). Berbeda dengan parity_check (reset per input),
+    ini menguji jalur update: indeks kolom -> rule, maksimum per penyakit
+    dan pembaruan kurva agregasi yang hanya membesar.
+    Returns:
+        Jumlah langkah yang hasilnya berbeda
+    """
+    rng = np.random.default_rng(seed)
+    symptoms = kb.rules.symptoms
+    ranges = [membership_range(kb.mf[g]) for g in symptoms]
+    engine = IncrementalInference(kb.rules, kb.output_mf, kb.y_domain)
+    mismatches = 0
+    for _ in range(steps):
+        i = int(rng.integers(len(symptoms)))
+        lo, hi = ranges[i]
+        kind = rng.integers(4)
+        if kind == 0:
+            value = None
+        elif kind == 1:
+            value = round(float(rng.uniform(lo, hi)), 1)
+        elif kind == 2:
+            value = float(rng.uniform(lo, hi))
+        else:
+            value = float(hi + rng.uniform(0, hi - lo)) if rng.random() < 0.5 else float(lo - rng.uniform(0, hi - lo))
+        engine.update(symptoms[i], value)
+        mismatches += engine.result() != diagnose(engine.inputs, kb.rules, kb.output_mf, kb.y_domain)
+    return mismatches
+
+# --- 7. Main ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per tahap pipeline fuzzy inference Mamdani berbobot.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 100, 1000, 10000],
+                        help="Jumlah rule; 0 berarti rule base asli")
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--instrument", action="store_true",
+                        help="Aktifkan instrumentasi engine selama benchmark (untuk mengukur overhead-nya)")
+    parser.add_argument("--imports", action="store_true",
+                        help="Profilkan waktu cold start (impor + KB biner) terhadap anggaran, bukan tahap pipeline")
+    parser.add_argument("--import-budget-scale", type=float, default=1.0,
+                        help="Pengali anggaran waktu impor (misalnya 2 untuk mesin yang lebih lambat)")
+    parser.add_argument("--parity", type=int, metavar="N",
+                        help="Cek hasil jalur cepat sama persis dengan versi acuan pada N input acak "
+                             "dan N langkah update inkremental, bukan benchmark")
+    parser.add_argument("-o", "--output", help="Simpan hasil sebagai JSON")
+    parser.add_argument("--compare", help="File JSON hasil sebelumnya untuk dibandingkan (rasio p50)")
+    # Tanpa --kb: benchmark membaca dan menulis ulang file CSV (load_csv, rule sintetis)
+    add_kb_arguments(parser, binary=False)
+    args = parser.parse_args(argv)
+
+    if args.imports:
+        profile = import_profile(5, args.mf, args.rules, args.output_mf, args.import_budget_scale, args.mf_shape)
+        for r in profile:
+            print(format_import_row(r))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({"environment": environment(), "imports": profile}, f, indent=2)
+        return 0 if all(r["ok"] for r in profile) else 1
+
+    if args.parity:
+        kb = load_from_args(args)
+        mismatches = parity_check(kb, args.parity, args.seed)
+        mismatches["update_walk"] = update_walk(kb, args.parity, args.seed)
+        for path, count in mismatches.items():
+            print(f"{path:<12} {count:6d} / {args.parity} berbeda dari versi acuan")
+        return 1 if any(mismatches.values()) else 0
+
+    if args.instrument:
+        INSTRUMENTATION.reset()
+        INSTRUMENTATION.enable()
+    results = run_benchmarks(args.sizes, args.batches, args.repeat, args.mf, args.rules, args.output_mf,
+                             lut_step=args.lut_step, seed=args.seed, mf_shape=args.mf_shape)
+    report = {
+        "environment": environment(),
+        "config": {"sizes": args.sizes, "batches": args.batches, "repeat": args.repeat,
+                   "lut_step": args.lut_step, "seed": args.seed, "mf_shape": args.mf_shape,
+                   "instrument": args.instrument},
+        "stages": STAGES,
+        "results": results,
+    }
+    if args.instrument:
+        report["instrumentation"] = INSTRUMENTATION.snapshot()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"{len(results)} hasil -> {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nPerbandingan p50 terhadap {args.compare} ({baseline['environment'].get('commit')}):")
+        for rules, batch, stage, old, new, ratio in compare(results, baseline):
+            flag = "  <-- lebih lambat" if ratio > 1.1 else ""
+            print(f"  rules={rules:>6} batch={batch:>6} {stage:<11} {old:9.3f}ms -> {new:9.3f}ms  x{ratio:.2f}{flag}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+import argparse
+import json
+import math
+import os
+import signal
+import sys
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+
+from fuzzy_engine import (DEFUZZ_LABELS, DiagnosisCache, batch_top, diagnose, diagnose_batch, membership_range,
+                          split_method)
+from knowledge_base import add_kb_arguments, load_from_args
+
+MAX_BODY = 8 * 1024 * 1024
+MAX_RECORDS = 10000
+
+# --- 1. Validasi dan Skoring Permintaan ---
+def parse_inputs(inputs, mf):
+    """
+    Memvalidasi satu record input: Dictionary gejala -> angka berhingga di
+    dalam semesta gejalanya (membership_range), sama seperti batas input di
+    aplikasi Streamlit. Gejala yang tidak dikenal diabaikan.
+    """
+    if not isinstance(inputs, dict):
+        raise ValueError("inputs must be an object mapping symptom names to numbers")
+    out = {}
+    for name, value in inputs.items():
+        if name not in mf or value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Input for {name} must be a number, got {value!r}")
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValueError(f"Input for {name} must be a finite number, got {value!r}")
+        lo, hi = membership_range(mf[name])
+        if not lo <= value <= hi:
+            raise ValueError(f"Input for {name} must be between {lo:g} and {hi:g}, got {value!r}")
+        out[name] = value
+    return out
+
+def parse_top_n(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"top_n must be an integer, got {value!r}")
+    if value < 1:
+        raise ValueError(f"top_n must be at least 1, got {value}")
+    return value
+
+def top_entries(top):
+    return [{"disease": d, "mu": float(v), "pct": float(p)} for d, v, p in top]
+
+def parse_method(method):
+    """Metode defuzzifikasi dari body permintaan: kunci DEFUZZ_LABELS atau "all", boleh berawalan "exact_"."""
+    if not isinstance(method, str) or split_method(method)[0] not in ("all", *DEFUZZ_LABELS):
+        raise ValueError(f"Unknown defuzzification method: {method!r}")
+    return method
+
+def score_single(kb, cache, inputs, method="mom", top_n=3):
+    """Diagnosis satu pasien lewat jalur rule aktif dan cache hasil per worker."""
+    method = parse_method(method)
+    inputs = parse_inputs(inputs, kb.mf)
+    z_star, top = cache.get_or_compute(
+        inputs, (kb.version, method, top_n),
+        lambda: diagnose(inputs, kb.rules, kb.output_mf, kb.y_domain, method, top_n),
+    )
+    if isinstance(z_star, dict):
+        z_star = {m: float(v) for m, v in z_star.items()}
+    else:
+        z_star = float(z_star)
+    return {"z_star": z_star, "top": top_entries(top)}
+
+def score_records(kb, cache, records, method="mom", top_n=3):
+    """
+    Diagnosis banyak pasien. Untuk MoM cukup satu panggilan diagnose_batch,
+    sehingga satu permintaan berisi N record hanya membayar satu kali
+    fuzzifikasi, firing strength dan agregasi berbasis array; metode lain
+    (diagnose_batch hanya MoM) dihitung per record seperti score_single.
+    """
+    method = parse_method(method)
+    if not isinstance(records, list):
+        raise ValueError("records must be a list of input objects")
+    if len(records) > MAX_RECORDS:
+        raise ValueError(f"At most {MAX_RECORDS} records per request")
+    records = [parse_inputs(rec, kb.mf) for rec in records]
+    if not records:
+        return []
+    if method != "mom":
+        return [score_single(kb, cache, rec, method, top_n) for rec in records]
+    res = diagnose_batch(records, kb.rules, kb.output_mf, kb.y_domain, top_n=top_n)
+    return [{"z_star": float(res.z_star[i]), "top": top_entries(batch_top(res, i))}
+            for i in range(len(records))]
+
+# --- 2. Handler HTTP ---
+class DiagnosisHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health    status worker dan versi knowledge base
+    POST /diagnose  {"inputs": {...}, "method": "mom", "top_n": 3}
+                    ("exact_mom", "exact_centroid", ... untuk defuzzifikasi analitik)
+                    atau {"records": [{...}, ...], "method": "mom", "top_n": 3} untuk batch
+    """
+
+    server_version = "Respirazzy/1.0"
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            kb = self.server.kb
+            self._send(200, {
+                "status": "ok",
+                "pid": os.getpid(),
+                "version": kb.version,
+                "rules": len(kb.rules.rule_disease),
+                "diseases": len(kb.rules.diseases),
+                "cache": self.server.cache.stats(),
+            })
+        else:
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/diagnose":
+            self._send(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send(400, {"error": "Invalid Content-Length"})
+            return
+        if length > MAX_BODY:
+            self._send(413, {"error": f"Request body larger than {MAX_BODY} bytes"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            top_n = parse_top_n(body.get("top_n", 3))
+            if "records" in body:
+                result = {"results": score_records(self.server.kb, self.server.cache, body["records"],
+                                                   body.get("method", "mom"), top_n)}
+            elif "inputs" in body:
+                result = score_single(self.server.kb, self.server.cache, body["inputs"],
+                                      body.get("method", "mom"), top_n)
+            else:
+                raise ValueError('Request body needs "inputs" or "records"')
+        except (ValueError, TypeError, OverflowError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(200, result)
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+class DiagnosisHTTPServer(HTTPServer):
+    """HTTPServer yang membawa knowledge base dan cache hasil untuk handler."""
+
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, address, kb, cache_size=4096, verbose=False):
+        super().__init__(address, DiagnosisHandler)
+        self.kb = kb
+        self.cache = DiagnosisCache(maxsize=cache_size, step=0.1)
+        self.verbose = verbose
+
+# --- 3. Pre-fork Worker ---
+def warm_up(kb):
+    """Menghitung kurva output dan jalur inferensi sekali sebelum fork agar dibagi copy-on-write."""
+    diagnose({}, kb.rules, kb.output_mf, kb.y_domain, "all")
+    diagnose_batch(np.full((1, len(kb.rules.symptoms)), np.nan), kb.rules, kb.output_mf, kb.y_domain)
+
+def serve(server, workers=2):
+    """
+    Menjalankan server dengan workers proses hasil fork yang berbagi satu
+    socket listening. Knowledge base sudah dimuat di proses induk, jadi
+    halaman memorinya dibagi copy-on-write (atau lewat mmap untuk KB biner).
+    Worker yang mati dijalankan ulang; SIGTERM/SIGINT menghentikan semuanya.
+    Tanpa os.fork (misalnya Windows) atau workers <= 0, server berjalan di
+    proses ini saja.
+    """
+    if workers <= 0 or not hasattr(os, "fork"):
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+        return
+
+    # Socket non-blocking: worker yang kalah berebut accept() tidak ikut tertahan
+    server.socket.setblocking(False)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            code = 0
+            try:
+                server.serve_forever()
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    previous = {s: signal.signal(s, stop) for s in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        for _ in range(workers):
+            spawn()
+        while children:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            children.discard(pid)
+            if not stopping:
+                spawn()
+    finally:
+        for s, handler in previous.items():
+            signal.signal(s, handler)
+        server.server_close()
+
+# --- 4. Klien Lokal ---
+class DiagnosisClient:
+    """Klien JSON sederhana (hanya pustaka standar) untuk menguji server secara lokal."""
+
+    def __init__(self, url="http://127.0.0.1:8000", timeout=10):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        req = urllib.request.Request(self.url + path, data=data,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            detail = json.loads(e.read() or b"{}").get("error", e.reason)
+            raise ValueError(f"HTTP {e.code}: {detail}") from None
+
+    def health(self):
+        return self._request("/health")
+
+    def diagnose(self, inputs, method="mom", top_n=3):
+        return self._request("/diagnose", {"inputs": inputs, "method": method, "top_n": top_n})
+
+    def diagnose_many(self, records, method="mom", top_n=3):
+        return self._request("/diagnose", {"records": records, "method": method, "top_n": top_n})["results"]
+
+# --- 5. Main ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server HTTP/JSON diagnosis fuzzy Mamdani berbobot (pre-fork).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Jumlah proses worker (0 untuk satu proses tanpa fork)")
+    parser.add_argument("--cache-size", type=int, default=4096)
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan log setiap permintaan")
+    add_kb_arguments(parser)
+    args = parser.parse_args(argv)
+
+    kb = load_from_args(args)
+    warm_up(kb)
+
+    server = DiagnosisHTTPServer((args.host, args.port), kb, args.cache_size, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Melayani {len(kb.rules.rule_disease)} rule di http://{host}:{port} "
+          f"({args.workers} worker, versi {kb.version})", file=sys.stderr, flush=True)
+    serve(server, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1418 @@
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+__all__ = [
+    # Fungsi keanggotaan
+    "var_and_set_name", "trimf", "trimf_array", "set_breakpoints",
+    "pwlmf", "membership", "membership_range", "pack_breakpoints", "pwl_columns",
+    # Himpunan output dan rule base terkompilasi
+    "register_output_curves", "output_set_curves", "CompiledRuleBase", "compile_rule_base",
+    "column_rule_index", "pad_rule_conditions", "MembershipLUT", "build_membership_lut", "with_membership_lut",
+    "lookup_memberships", "symptom_memberships", "fuzzify_vector", "rule_strengths",
+    "disease_strengths", "active_rules",
+    # Defuzzifikasi
+    "DEFUZZ_LABELS", "defuzzify_mom", "defuzzify", "ANALYTIC_PREFIX", "split_method", "defuzzify_analytic",
+    # Inferensi
+    "implication", "fuzzy_inference_mamdani_weighted", "fuzzy_inference_sparse", "fuzzy_inference_analytic",
+    "fuzzy_inference_confidence_weighted", "diagnose", "IncrementalInference",
+    # Jejak penjelasan
+    "ConditionTrace", "RuleTrace", "InferenceTrace", "explain_rules",
+    # Batch, top-N dan cache
+    "BatchDiagnosis", "batch_matrix", "aggregate_rows", "defuzzify_mom_rows", "top_n_rows",
+    "batch_top", "diagnose_batch",
+    "get_top_diagnoses", "normalize_top_n", "DiagnosisCache",
+    # Instrumentasi
+    "Instrumentation", "INSTRUMENTATION",
+]
+
+# --- 1. Helper Token dan Fungsi Keanggotaan ---
+def var_and_set_name(tok):
+    """Memisahkan nama variabel dan set dari token"""
+    parts = tok.split('_')
+    return '_'.join(parts[:-1]), parts[-1]
+
+def trimf(x, params):
+    """
+    Menghitung derajat keanggotaan fungsi segitiga.
+    Args:
+        x: Nilai input
+        params: Parameter fungsi segitiga (a,b,c)
+    Returns:
+        Derajat keanggotaan [0,1]
+    """
+    a, b, c = params
+    if a == b == c:
+        return 1.0 if x == a else 0.0
+    if x <= a or x >= c:
+        return 0.0
+    if x <= b:
+        return (x - a) / (b - a)
+    return (c - x) / (c - b)
+
+def trimf_array(x, params):
+    """
+    Versi vektor dari `trimf`: menghitung seluruh array input sekaligus.
+    Cabang dan rumus sama persis dengan `trimf`, sehingga hasilnya identik
+    per titik.
+    Args:
+        x: Array nilai input
+        params: Parameter fungsi segitiga (a,b,c)
+    Returns:
+        Array derajat keanggotaan [0,1] dengan bentuk yang sama dengan x
+    """
+    x = np.asarray(x, dtype=float)
+    a, b, c = params
+    if a == b == c:
+        return np.where(x == a, 1.0, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu = np.where(x <= b, (x - a) / (b - a), (c - x) / (c - b))
+    return np.where((x <= a) | (x >= c), 0.0, mu)
+
+# --- 1b. Trapesium, Shoulder dan Piecewise-Linear ---
+def set_breakpoints(params):
+    """
+    Mengubah parameter himpunan menjadi titik patah (xs, ys) piecewise-linear.
+    - (a,b,c): segitiga
+    - (a,b,c,d): trapesium; a == b menjadi shoulder kiri (bernilai 1 untuk
+      x <= b) dan c == d menjadi shoulder kanan (bernilai 1 untuk x >= c)
+    - ((x0,y0), (x1,y1), ...): piecewise-linear umum, x tidak menurun
+    Di luar titik pertama/terakhir nilainya mengikuti y titik ujung; jika
+    semua x sama, himpunan bernilai 1 hanya tepat di titik itu.
+    """
+    if len(params) and np.ndim(params[0]) == 1:
+        xs = [float(px) for px, _ in params]
+        ys = [float(py) for _, py in params]
+        if any(x1 < x0 for x0, x1 in zip(xs, xs[1:])):
+            raise ValueError(f"Piecewise-linear breakpoints must be sorted by x: {params}")
+        return xs, ys
+    if len(params) == 3:
+        a, b, c = map(float, params)
+        return [a, b, c], [0.0, 1.0, 0.0]
+    if len(params) == 4:
+        a, b, c, d = map(float, params)
+        xs, ys = [b, c], [1.0, 1.0]
+        if a != b:
+            xs, ys = [a] + xs, [0.0] + ys
+        if c != d:
+            xs, ys = xs + [d], ys + [0.0]
+        return xs, ys
+    raise ValueError(f"Unsupported membership parameters: {params}")
+
+def pwlmf(x, params):
+    """
+    Derajat keanggotaan skalar untuk himpunan apa pun yang didukung
+    set_breakpoints. Untuk segitiga hasilnya identik dengan trimf.
+    """
+    xs, ys = set_breakpoints(params)
+    if xs[0] == xs[-1]:
+        return 1.0 if x == xs[0] else 0.0
+    if x <= xs[0]:
+        return ys[0]
+    if x >= xs[-1]:
+        return ys[-1]
+    for k in range(1, len(xs)):
+        if x <= xs[k]:
+            x0, x1, y0, y1 = xs[k - 1], xs[k], ys[k - 1], ys[k]
+            if y0 == y1:
+                return y0
+            return (y0 * (x1 - x) + y1 * (x - x0)) / (x1 - x0)
+
+def membership(x, params):
+    """Derajat keanggotaan skalar: trimf untuk segitiga, pwlmf untuk bentuk lain."""
+    if len(params) == 3 and np.ndim(params[0]) == 0:
+        return trimf(x, params)
+    return pwlmf(x, params)
+
+def membership_range(sets):
+    """Batas (bawah, atas) semesta dari semua himpunan sebuah gejala."""
+    pts = [px for params in sets.values() for px in set_breakpoints(params)[0]]
+    return min(pts), max(pts)
+
+def pack_breakpoints(param_list):
+    """
+    Menyusun titik patah semua himpunan ke array padat (M, K); himpunan
+    dengan titik lebih sedikit diisi dengan mengulang titik terakhirnya.
+    """
+    points = [set_breakpoints(p) for p in param_list]
+    k = max([2] + [len(xs) for xs, _ in points])
+    set_x, set_y = np.zeros((len(points), k)), np.zeros((len(points), k))
+    for j, (xs, ys) in enumerate(points):
+        set_x[j] = xs + [xs[-1]] * (k - len(xs))
+        set_y[j] = ys + [ys[-1]] * (k - len(ys))
+    return set_x, set_y
+
+def pwl_columns(x, set_x, set_y):
+    """
+    Kernel vektor piecewise-linear untuk semua himpunan sekaligus.
+    Args:
+        x: Array input (..., M), NaN berarti gejala tidak diisi
+        set_x, set_y: Titik patah per kolom (M, K), lihat pack_breakpoints
+    Returns:
+        Array derajat keanggotaan (..., M); sama dengan pwlmf per elemen
+    """
+    x = np.asarray(x, dtype=float)
+    k = (set_x < x[..., None]).sum(axis=-1)
+    seg = np.clip(k - 1, 0, set_x.shape[1] - 2)
+    cols = np.arange(set_x.shape[0])
+    x0, x1 = set_x[cols, seg], set_x[cols, seg + 1]
+    y0, y1 = set_y[cols, seg], set_y[cols, seg + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mu = (y0 * (x1 - x) + y1 * (x - x0)) / (x1 - x0)
+    mu = np.where(y0 == y1, y0, mu)
+    mu = np.where(k == 0, set_y[:, 0], mu)
+    mu = np.where(x >= set_x[:, -1], set_y[:, -1], mu)
+    point = set_x[:, 0] == set_x[:, -1]
+    if point.any():
+        mu = np.where(point, np.where(x == set_x[:, 0], 1.0, 0.0), mu)
+    return np.where(np.isnan(x), 0.0, mu)
+
+# --- 2. Kurva Himpunan Output ---
+_CURVE_CACHE = {}
+_CURVE_CACHE_SIZE = 8
+
+def _curve_key(output_mf, y):
+    return (tuple((d, tuple(map(float, p))) for d, p in output_mf.items()), y.shape, y.tobytes())
+
+def register_output_curves(output_mf, y_domain, curves):
+    """
+    Mendaftarkan kurva output yang sudah dihitung sebelumnya (misalnya dari
+    artefak knowledge base biner) agar output_set_curves tidak menghitung ulang.
+    """
+    y = np.asarray(y_domain, dtype=float)
+    names = list(output_mf)
+    result = (names, {d: i for i, d in enumerate(names)}, curves)
+    if len(_CURVE_CACHE) >= _CURVE_CACHE_SIZE:
+        _CURVE_CACHE.clear()
+    _CURVE_CACHE[_curve_key(output_mf, y)] = result
+    return result
+
+def output_set_curves(output_mf, y_domain):
+    """
+    Menghitung kurva setiap himpunan output di atas semesta y_domain.
+    Kurva hanya dihitung sekali per kombinasi (output_mf, y_domain),
+    panggilan berikutnya memakai hasil yang tersimpan.
+    Returns:
+        names: List nama penyakit (urutan baris)
+        index: Dictionary nama penyakit -> nomor baris
+        curves: Array (jumlah penyakit x len(y_domain)), read-only
+    """
+    y = np.asarray(y_domain, dtype=float)
+    hit = _CURVE_CACHE.get(_curve_key(output_mf, y))
+    if hit is not None:
+        return hit
+
+    curves = np.empty((len(output_mf), y.size))
+    for i, params in enumerate(output_mf.values()):
+        curves[i] = trimf_array(y, params)
+    curves.setflags(write=False)
+    return register_output_curves(output_mf, y, curves)
+
+# --- 3. Rule Base Terkompilasi ---
+CompiledRuleBase = namedtuple("CompiledRuleBase", [
+    "symptoms",        # List nama gejala, urutan sesuai mf
+    "columns",         # List pasangan (gejala, set) per kolom vektor keanggotaan
+    "column_index",    # Dictionary (gejala, set) -> nomor kolom
+    "column_symptom",  # Array int (M,) nomor gejala untuk setiap kolom
+    "set_params",      # List parameter asli himpunan per kolom (lihat set_breakpoints)
+    "set_x",           # Array float (M, K) titik patah x per kolom
+    "set_y",           # Array float (M, K) titik patah y per kolom
+    "diseases",        # List nama penyakit, urutan kemunculan pertama
+    "rule_disease",    # Array int (R,) nomor penyakit untuk setiap rule
+    "weights",         # Array float bobot asli setiap kondisi (format CSR)
+    "rule_ptr",        # Array int (R+1,) batas kondisi setiap rule (CSR)
+    "cond_index",      # Array int kolom yang dirujuk setiap kondisi (CSR)
+    "rule_total",      # Array float (R,) sum(bobot) setiap rule, termasuk kondisi tak dikenal
+    "rule_cols",       # Array int (R, K) kolom kondisi per rule, diisi 0 di ujung (lihat pad_rule_conditions)
+    "rule_weights",    # Array float (R, K) bobot asli per rule, diisi 0.0 di ujung
+    "column_ptr",      # Array int (M+1,) batas daftar rule per kolom (CSC)
+    "column_rules",    # Array int nomor rule yang merujuk setiap kolom (CSC)
+    "rules",           # List rule asli (kondisi, bobot, nama_penyakit)
+    "lut",             # MembershipLUT opsional (lihat with_membership_lut)
+], defaults=(None,))
+
+def column_rule_index(rule_ptr, cond_index, n_columns):
+    """
+    Indeks balik kolom -> rule (format CSC) dari indeks rule -> kolom (CSR),
+    untuk mencari rule yang tersentuh oleh keanggotaan tidak nol.
+    """
+    rows = np.repeat(np.arange(len(rule_ptr) - 1), np.diff(rule_ptr))
+    order = np.argsort(cond_index, kind='stable')
+    column_ptr = np.zeros(n_columns + 1, dtype=np.intp)
+    np.cumsum(np.bincount(cond_index, minlength=n_columns), out=column_ptr[1:])
+    return column_ptr, rows[order].astype(np.intp)
+
+def pad_rule_conditions(rule_ptr, cond_index, weights):
+    """
+    Bentuk padat (R, K) dari kondisi CSR, K = kondisi terbanyak dalam satu
+    rule. Sisa baris diisi kolom 0 dengan bobot 0.0, yang menambah tepat 0.0
+    ke jumlah (mu selalu berhingga).
+    """
+    lengths = np.diff(rule_ptr)
+    k = max(1, int(lengths.max())) if lengths.size else 1
+    rows = np.repeat(np.arange(lengths.size), lengths)
+    slots = np.arange(cond_index.size) - np.repeat(rule_ptr[:-1], lengths)
+    rule_cols = np.zeros((lengths.size, k), dtype=np.intp)
+    rule_weights = np.zeros((lengths.size, k))
+    rule_cols[rows, slots] = cond_index
+    rule_weights[rows, slots] = weights
+    return rule_cols, rule_weights
+
+def _gather(ptr, values, selected):
+    """Menggabungkan values[ptr[j]:ptr[j+1]] untuk semua j terpilih tanpa loop Python."""
+    starts, stops = ptr[selected], ptr[selected + 1]
+    lengths = stops - starts
+    total = lengths.sum()
+    if total == 0:
+        return values[:0]
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return values[offsets + np.arange(total)]
+
+def compile_rule_base(rules, mf):
+    """
+    Mengompilasi rule sekali saat dimuat: token kondisi diubah menjadi
+    nomor kolom pada vektor keanggotaan padat, sehingga firing strength
+    dihitung berbasis array tanpa parsing string (lihat rule_strengths).
+    Kondisi yang merujuk gejala/set yang tidak ada di mf selalu bernilai 0,
+    jadi hanya bobotnya yang ikut dalam penyebut.
+    Returns:
+        CompiledRuleBase
+    """
+    symptoms = list(mf)
+    columns, params, column_symptom = [], [], []
+    for i, g in enumerate(symptoms):
+        for setn, p in mf[g].items():
+            columns.append((g, setn))
+            params.append(p)
+            column_symptom.append(i)
+    column_index = {col: j for j, col in enumerate(columns)}
+
+    diseases, disease_index = [], {}
+    rule_disease, rule_ptr, cond_index, cond_weight, rule_total = [], [0], [], [], []
+    for conds, weights, disease in rules:
+        if disease not in disease_index:
+            disease_index[disease] = len(diseases)
+            diseases.append(disease)
+        rule_disease.append(disease_index[disease])
+        total = sum(weights)
+        if conds and not total:
+            raise ValueError(f"Rule for {disease} has zero total weight")
+        # Rule tanpa kondisi ber-alpha 0 seperti versi acuan; penyebut 1 menghindari 0/0
+        rule_total.append(total if conds else 1.0)
+        for cond, w in zip(conds, weights):
+            j = column_index.get(var_and_set_name(cond))
+            if j is None:
+                continue
+            cond_index.append(j)
+            cond_weight.append(w)
+        rule_ptr.append(len(cond_index))
+
+    rule_ptr = np.array(rule_ptr, dtype=np.intp)
+    cond_index = np.array(cond_index, dtype=np.intp)
+    cond_weight = np.array(cond_weight, dtype=float)
+    rule_cols, rule_weights = pad_rule_conditions(rule_ptr, cond_index, cond_weight)
+    column_ptr, column_rules = column_rule_index(rule_ptr, cond_index, len(columns))
+    set_x, set_y = pack_breakpoints(params)
+
+    return CompiledRuleBase(
+        symptoms=symptoms,
+        columns=columns,
+        column_index=column_index,
+        column_symptom=np.array(column_symptom, dtype=np.intp),
+        set_params=params,
+        set_x=set_x,
+        set_y=set_y,
+        diseases=diseases,
+        rule_disease=np.array(rule_disease, dtype=np.intp),
+        weights=cond_weight,
+        rule_ptr=rule_ptr,
+        cond_index=cond_index,
+        rule_total=np.array(rule_total, dtype=float),
+        rule_cols=rule_cols,
+        rule_weights=rule_weights,
+        column_ptr=column_ptr,
+        column_rules=column_rules,
+        rules=list(rules),
+    )
+
+# --- 3b. Tabel Lookup Keanggotaan ---
+MembershipLUT = namedtuple("MembershipLUT", [
+    "step",    # Resolusi input (misalnya 0.1, sama dengan step number_input)
+    "lo",      # Array (S,) batas bawah semesta setiap gejala
+    "size",    # Array int (S,) jumlah titik grid setiap gejala
+    "offset",  # Array int (S,) baris awal tabel setiap gejala
+    "grid",    # Array (P,) nilai input di setiap baris tabel
+    "table",   # Array (P, M) vektor keanggotaan untuk setiap nilai grid
+])
+
+def build_membership_lut(compiled, step=0.1):
+    """
+    Menghitung tabel lookup keanggotaan per gejala sekali saat dimuat.
+    Semesta setiap gejala (min..max parameter setnya, misalnya 0–10 atau
+    36–41 °C untuk demam) dicacah dengan resolusi step; setiap baris berisi
+    derajat keanggotaan gejala itu di semua setnya.
+    """
+    n_sym = len(compiled.symptoms)
+    lo, size = np.zeros(n_sym), np.zeros(n_sym, dtype=np.intp)
+    grids = []
+    for i in range(n_sym):
+        xs = compiled.set_x[compiled.column_symptom == i]
+        lo[i], hi = xs.min(), xs.max()
+        size[i] = int(round((hi - lo[i]) / step)) + 1
+        # Pembulatan membuat nilai grid sama persis dengan literal desimalnya (36.3, 5.7, ...)
+        grids.append(np.round(lo[i] + np.arange(size[i]) * step, 10))
+    offset = np.concatenate([[0], np.cumsum(size)[:-1]]).astype(np.intp)
+    grid = np.concatenate(grids)
+    owner = np.repeat(np.arange(n_sym), size)
+    x = np.where(owner[:, None] == compiled.column_symptom[None, :], grid[:, None], np.nan)
+    table = pwl_columns(x, compiled.set_x, compiled.set_y)
+    for arr in (lo, size, offset, grid, table):
+        arr.setflags(write=False)
+    return MembershipLUT(step, lo, size, offset, grid, table)
+
+def with_membership_lut(compiled, step=0.1):
+    """Mengaktifkan fuzzifikasi berbasis tabel lookup pada rule base terkompilasi."""
+    return compiled._replace(lut=build_membership_lut(compiled, step))
+
+def lookup_memberships(x, compiled):
+    """
+    Fuzzifikasi array input (..., S) lewat tabel lookup. Nilai yang tepat
+    berada di grid langsung diambil dari tabel; nilai di luar grid atau di
+    luar semesta dihitung eksak dengan pwl_columns.
+    """
+    lut = compiled.lut
+    x = np.asarray(x, dtype=float)
+    with np.errstate(invalid='ignore', over='ignore'):
+        idx = np.rint((x - lut.lo) / lut.step)
+        # NaN/inf tidak pernah valid, jadi tidak ada nilai non-finite yang sampai ke astype
+        valid = np.isfinite(idx) & (idx >= 0) & (idx < lut.size)
+    row = lut.offset + np.where(valid, idx, 0).astype(np.intp)
+    hit = valid & (lut.grid[row] == x)
+
+    cols = compiled.column_symptom
+    mu = lut.table[row[..., cols], np.arange(cols.size)]
+    miss = ~hit[..., cols]
+    if miss.any():
+        which = np.broadcast_to(np.arange(cols.size), miss.shape)[miss]
+        mu[miss] = pwl_columns(x[..., cols][miss], compiled.set_x[which], compiled.set_y[which])
+    return mu
+
+def symptom_memberships(x, compiled):
+    """Vektor keanggotaan (..., M) dari array input (..., S); memakai LUT jika tersedia."""
+    if compiled.lut is not None:
+        return lookup_memberships(x, compiled)
+    x = np.asarray(x, dtype=float)[..., compiled.column_symptom]
+    return pwl_columns(x, compiled.set_x, compiled.set_y)
+
+def fuzzify_vector(inputs, compiled):
+    """
+    Fuzzifikasi ke vektor keanggotaan padat sesuai kolom rule base.
+    Gejala yang tidak ada di inputs bernilai 0 di semua set.
+    """
+    x = np.full(len(compiled.symptoms), np.nan)
+    for i, g in enumerate(compiled.symptoms):
+        if g in inputs:
+            x[i] = inputs[g]
+    return symptom_memberships(x, compiled)
+
+def rule_strengths(compiled, mu, rules=None):
+    """
+    Firing strength rule (..., R) dari vektor keanggotaan (..., M), atau
+    hanya untuk nomor rule di rules. mu * bobot dijumlahkan kondisi demi
+    kondisi lalu dibagi total bobot, urutan operasi float yang sama dengan
+    sum(mu * w) / sum(w) di fuzzy_inference_mamdani_weighted. Hasilnya sama
+    persis dengan versi acuan, sehingga alpha yang seri tetap seri
+    (perkalian matriks menjumlahkan dengan urutan lain dan bisa bergeser 1 ulp).
+    """
+    cols, weights, total = compiled.rule_cols, compiled.rule_weights, compiled.rule_total
+    if rules is not None:
+        cols, weights, total = cols[rules], weights[rules], total[rules]
+    mu = np.asarray(mu, dtype=float)
+    acc = np.zeros(mu.shape[:-1] + (cols.shape[0],))
+    for k in range(cols.shape[1]):
+        acc += mu[..., cols[:, k]] * weights[:, k]
+    return acc / total
+
+def disease_strengths(compiled, alpha):
+    """Alpha terbesar per penyakit dari alpha per rule (kolom terakhir)."""
+    out = np.zeros(alpha.shape[:-1] + (len(compiled.diseases),))
+    if alpha.shape[-1]:
+        np.maximum.at(out.T, compiled.rule_disease, alpha.T)
+    return out
+
+# --- 4. Defuzzifikasi ---
+def defuzzify_mom(y, mu):
+    max_mu = np.max(mu)
+    if max_mu == 0:
+        return 0.0
+    y_max = y[mu == max_mu]
+    return (y_max[0] + y_max[-1]) / 2
+
+DEFUZZ_LABELS = {
+    "mom": "Mean of Maximum",
+    "som": "Smallest of Maximum",
+    "lom": "Largest of Maximum",
+    "centroid": "Centroid",
+    "bisector": "Bisector",
+    "wavg": "Weighted Average",
+}
+
+def _defuzz_kernel(y, mu):
+    """
+    Besaran bersama untuk semua metode grid, dihitung sekali per kurva
+    agregasi: tinggi maksimum, indeks titik maksimum dan luas kumulatif.
+    """
+    max_mu = np.max(mu)
+    at_max = np.flatnonzero(mu == max_mu)
+    cum = np.cumsum(mu)
+    return max_mu, at_max, cum
+
+def _weighted_average(alpha, peaks):
+    if alpha is None or peaks is None:
+        raise ValueError("Weighted average defuzzification needs per-disease alpha and output peaks")
+    alpha = np.asarray(alpha, dtype=float)
+    total = alpha.sum()
+    return float(alpha @ np.asarray(peaks, dtype=float) / total) if total > 0 else 0.0
+
+def _grid_defuzz(method, y, mu, kernel, alpha, peaks):
+    if method == "wavg":
+        return _weighted_average(alpha, peaks)
+    max_mu, at_max, cum = kernel
+    if max_mu == 0:
+        return 0.0
+    if method == "mom":
+        return (y[at_max[0]] + y[at_max[-1]]) / 2
+    if method == "som":
+        return y[at_max[0]]
+    if method == "lom":
+        return y[at_max[-1]]
+    if method == "centroid":
+        return float(y @ mu / cum[-1])
+    if method == "bisector":
+        return y[np.searchsorted(cum, cum[-1] / 2)]
+    raise ValueError(f"Unknown defuzzification method: {method}")
+
+def defuzzify(y, mu, method="mom", alpha=None, peaks=None):
+    """
+    Defuzzifikasi kurva agregasi dengan metode pilihan.
+    Args:
+        y: Semesta output
+        mu: Kurva agregasi
+        method: Salah satu kunci DEFUZZ_LABELS, atau "all" untuk semua metode
+        alpha, peaks: Alpha per penyakit dan puncak (b) himpunan output,
+            hanya dibutuhkan oleh "wavg"
+    Returns:
+        Nilai crisp, atau Dictionary metode -> nilai crisp jika method="all"
+    """
+    kernel = _defuzz_kernel(y, mu)
+    if method == "all":
+        methods = [m for m in DEFUZZ_LABELS if m != "wavg" or alpha is not None]
+        return {m: _grid_defuzz(m, y, mu, kernel, alpha, peaks) for m in methods}
+    return _grid_defuzz(method, y, mu, kernel, alpha, peaks)
+
+# --- 5. Inferensi Fuzzy Mamdani ---
+def implication(alpha, params, y):
+    """Implikasi Mamdani: kurva himpunan output dipotong setinggi alpha."""
+    return np.minimum(alpha, trimf_array(y, params))
+
+def fuzzy_inference_mamdani_weighted(inputs, mf, rules, output_mf, y_domain, trace=None):
+    """
+    Inferensi Mamdani berbobot versi acuan (rule demi rule).
+    Args:
+        inputs: Dictionary nilai input untuk setiap gejala
+        mf: Dictionary fungsi keanggotaan
+        rules: List tuple (kondisi, bobot, nama_penyakit)
+        trace: InferenceTrace opsional yang diisi mu, bobot dan kontribusi
+            setiap kondisi; tidak ada teks yang diformat di sini
+    Returns:
+        z_star: Nilai crisp hasil defuzzifikasi MoM
+        per_disease: Dictionary kurva output terpotong per penyakit
+        aggregated: Kurva output hasil agregasi
+    """
+    fuzzy_vals = {}
+    for var, x in inputs.items():
+        fuzzy_vals[var] = {}
+        for setn, params in mf.get(var, {}).items():
+            fuzzy_vals[var][setn] = membership(x, params)
+    if trace is not None:
+        trace.start("mamdani", inputs, fuzzy_vals)
+
+    aggregated = np.zeros_like(y_domain)
+    per_disease = {}
+
+    for conds, weights, disease in rules:
+        match_vals = []
+        for cond in conds:
+            var, setn = var_and_set_name(cond)
+            match_vals.append(fuzzy_vals.get(var, {}).get(setn, 0.0))
+        if not match_vals:
+            alpha = 0
+        else:
+            alpha = sum(mu * w for mu, w in zip(match_vals, weights)) / sum(weights)
+        if trace is not None:
+            trace.add_rule(disease, conds, match_vals, weights, alpha)
+
+        clipped = implication(alpha, output_mf[disease], y_domain)
+        aggregated = np.maximum(aggregated, clipped)
+        if disease not in per_disease:
+            per_disease[disease] = clipped
+        else:
+            per_disease[disease] = np.maximum(per_disease[disease], clipped)
+
+    z_star = defuzzify_mom(y_domain, aggregated)
+    return z_star, per_disease, aggregated
+
+def active_rules(compiled, mu):
+    """Nomor rule (terurut, unik) yang merujuk minimal satu kolom dengan mu > 0."""
+    touched = _gather(compiled.column_ptr, compiled.column_rules, np.flatnonzero(mu))
+    return np.unique(touched)
+
+def fuzzy_inference_sparse(inputs, compiled, output_mf, y_domain, method="mom"):
+    """
+    Inferensi Mamdani berbobot yang hanya mengevaluasi rule aktif.
+    Rule yang semua kolomnya bernilai 0 pasti ber-alpha 0, sehingga
+    implikasi dan agregasinya dilewati; biaya sebanding dengan jumlah rule
+    aktif, bukan jumlah seluruh rule. Hasil sama persis dengan
+    fuzzy_inference_mamdani_weighted (lihat rule_strengths).
+    Returns:
+        z_star, per_disease, aggregated
+    """
+    inst = INSTRUMENTATION if INSTRUMENTATION.enabled else None
+    t = inst.start() if inst else 0
+    mu = fuzzify_vector(inputs, compiled)
+    if inst:
+        t = inst.stage("fuzzify", t, mu=mu)
+    rules = active_rules(compiled, mu)
+    alpha = np.zeros(len(compiled.diseases))
+    if rules.size:
+        np.maximum.at(alpha, compiled.rule_disease[rules], rule_strengths(compiled, mu, rules))
+    if inst:
+        inst.count("rules_evaluated", rules.size)
+        inst.count("rules_skipped", len(compiled.rule_disease) - rules.size)
+        t = inst.stage("rules", t, alpha=alpha, active_rules=rules)
+
+    aggregated = np.zeros_like(y_domain, dtype=float)
+    per_disease = dict.fromkeys(compiled.diseases, aggregated)
+    active = np.flatnonzero(alpha > 0)
+    if active.size:
+        names, index, curves = output_set_curves(output_mf, y_domain)
+        rows = [index[compiled.diseases[j]] for j in active]
+        clipped = np.minimum(alpha[active, None], curves[rows])
+        if inst:
+            t = inst.stage("implication", t, clipped=clipped)
+        aggregated = clipped.max(axis=0)
+        per_disease.update(zip((compiled.diseases[j] for j in active), clipped))
+    if inst:
+        t = inst.stage("aggregation", t, aggregated=aggregated)
+
+    peaks = [output_mf[d][1] for d in compiled.diseases]
+    z_star = defuzzify(y_domain, aggregated, method, alpha, peaks)
+    if inst:
+        inst.stage("defuzzify", t, z_star=z_star)
+    return z_star, per_disease, aggregated
+
+# --- 6. Diagnosis Batch ---
+BatchDiagnosis = namedtuple("BatchDiagnosis", [
+    "diseases",        # List nama penyakit (urutan kolom)
+    "alpha",           # Array (N, D) firing strength terbesar per penyakit
+    "max_membership",  # Array (N, D) puncak kurva output terpotong per penyakit
+    "z_star",          # Array (N,) nilai crisp MoM
+    "top_index",       # Array int (N, top_n) nomor penyakit teratas, -1 jika kosong
+    "top_score",       # Array (N, top_n) derajat keanggotaan penyakit teratas
+    "top_percent",     # Array (N, top_n) persentase ternormalisasi dalam top_n
+])
+
+def batch_matrix(records, compiled):
+    """
+    Mengubah records menjadi array (N, jumlah gejala) sesuai urutan
+    compiled.symptoms. DataFrame dan List Dictionary dipilih berdasarkan nama
+    gejala (kunci label_map); gejala yang tidak ada atau kosong dianggap tidak diisi.
+    """
+    if hasattr(records, "reindex"):
+        # na_value: kolom nullable (Int64, Float64) memakai pd.NA untuk sel kosong
+        return records.reindex(columns=compiled.symptoms).to_numpy(dtype=float, na_value=np.nan)
+    if isinstance(records, (list, tuple)) and records and isinstance(records[0], dict):
+        x = np.full((len(records), len(compiled.symptoms)), np.nan)
+        for i, rec in enumerate(records):
+            for j, g in enumerate(compiled.symptoms):
+                if rec.get(g) is not None:
+                    x[i, j] = rec[g]
+        return x
+    x = np.asarray(records, dtype=float)
+    if x.ndim != 2 or x.shape[1] != len(compiled.symptoms):
+        raise ValueError(f"Expected an N x {len(compiled.symptoms)} array, got shape {x.shape}")
+    return x
+
+def defuzzify_mom_rows(y, mu):
+    """Defuzzifikasi MoM untuk setiap baris array (N, len(y))."""
+    max_mu = mu.max(axis=1)
+    at_max = mu == max_mu[:, None]
+    first = at_max.argmax(axis=1)
+    last = mu.shape[1] - 1 - at_max[:, ::-1].argmax(axis=1)
+    return np.where(max_mu == 0, 0.0, (y[first] + y[last]) / 2)
+
+def top_n_rows(scores, n=3):
+    """
+    Versi baris dari get_top_diagnoses: n skor positif terbesar per baris
+    (urutan stabil) beserta persentasenya terhadap total n teratas.
+    """
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :n]
+    top = np.take_along_axis(scores, order, axis=1)
+    valid = top > 0
+    top = np.where(valid, top, 0.0)
+    total = top.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(valid & (total > 0), 100 * top / total, 0.0)
+    return np.where(valid, order, -1), top, pct
+
+def aggregate_rows(alpha, curves):
+    """
+    Implikasi dan agregasi max untuk setiap baris: alpha (N, D) memotong
+    kurva output (D, len(y)) lalu diambil maksimumnya per baris.
+    """
+    aggregated = np.zeros((alpha.shape[0], curves.shape[1]))
+    for j in range(curves.shape[0]):
+        np.maximum(aggregated, np.minimum(alpha[:, j, None], curves[j]), out=aggregated)
+    return aggregated
+
+def batch_top(res, i):
+    """Top-n baris i dari BatchDiagnosis dalam format get_top_diagnoses."""
+    return [(res.diseases[k], res.top_score[i, n], res.top_percent[i, n])
+            for n, k in enumerate(res.top_index[i]) if k >= 0]
+
+def diagnose_batch(records, compiled, output_mf, y_domain, chunk_size=512, top_n=3):
+    """
+    Mendiagnosis banyak pasien sekaligus.
+    Fuzzifikasi, firing strength dan agregasi dihitung per potongan
+    (chunk) berisi chunk_size baris, sehingga memori kerja tetap
+    O(chunk_size x len(y_domain)) berapa pun jumlah baris.
+    Args:
+        records: Array (N, jumlah gejala) atau DataFrame dengan kolom gejala
+        compiled: CompiledRuleBase
+    Returns:
+        BatchDiagnosis
+    """
+    x = batch_matrix(records, compiled)
+    y = np.asarray(y_domain, dtype=float)
+    n, d = len(x), len(compiled.diseases)
+
+    names, index, curves = output_set_curves(output_mf, y)
+    curves = curves[[index[dz] for dz in compiled.diseases]]
+    peaks = curves.max(axis=1) if d else np.zeros(0)
+
+    inst = INSTRUMENTATION if INSTRUMENTATION.enabled else None
+    alpha = np.zeros((n, d))
+    z_star = np.zeros(n)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        t = inst.start() if inst else 0
+        mu = symptom_memberships(x[start:stop], compiled)
+        if inst:
+            t = inst.stage("fuzzify", t, mu=mu)
+        a = disease_strengths(compiled, rule_strengths(compiled, mu))
+        if inst:
+            inst.count("rules_evaluated", (stop - start) * len(compiled.rule_disease))
+            t = inst.stage("rules", t, alpha=a)
+        # Implikasi dan agregasi digabung per baris (lihat aggregate_rows)
+        aggregated = aggregate_rows(a, curves)
+        if inst:
+            t = inst.stage("aggregation", t, aggregated=aggregated)
+        alpha[start:stop] = a
+        z_star[start:stop] = defuzzify_mom_rows(y, aggregated)
+        if inst:
+            inst.stage("defuzzify", t, z_star=z_star[start:stop])
+
+    t = inst.start() if inst else 0
+    # max_y min(alpha, f(y)) == min(alpha, max_y f(y))
+    max_membership = np.minimum(alpha, peaks)
+    top_index, top_score, top_percent = top_n_rows(max_membership, top_n)
+    if inst:
+        inst.count("diagnoses", n)
+        inst.stage("top_n", t, top_index=top_index)
+    return BatchDiagnosis(compiled.diseases, alpha, max_membership, z_star,
+                          top_index, top_score, top_percent)
+
+# --- 7. Defuzzifikasi Analitik ---
+ANALYTIC_PREFIX = "exact_"
+
+def split_method(method):
+    """
+    Memisahkan nama metode yang diterima diagnose: "exact_<m>" berarti
+    defuzzifikasi analitik m (lihat defuzzify_analytic), selain itu grid.
+    Returns:
+        Tuple (metode, analitik)
+    """
+    if method.startswith(ANALYTIC_PREFIX):
+        return method[len(ANALYTIC_PREFIX):], True
+    return method, False
+
+def _clipped_heights(alpha):
+    """Tinggi setiap himpunan output setelah dipotong alpha (puncak segitiga = 1)."""
+    return np.clip(np.asarray(alpha, dtype=float), 0.0, 1.0)
+
+def _plateaus(h, params):
+    """Interval datar [kiri, kanan] setiap segitiga yang dipotong setinggi h."""
+    a, b, c = params[:, 0], params[:, 1], params[:, 2]
+    return a + h * (b - a), c - h * (c - b)
+
+def _trapezoid(a, b, c, h):
+    """
+    Segitiga (a,b,c) yang dipotong setinggi h sebagai (xs, vl, vr): titik
+    patah terurut dengan limit kiri dan kanan kurva di setiap titik, agar
+    lompatan pada segitiga degenerat (a == b atau b == c) tetap terwakili.
+    """
+    left = a + h * (b - a)
+    right = max(c - h * (c - b), left)
+    xs, vl, vr = [], [], []
+    for x, y in ((a, 0.0), (left, h), (right, h), (c, 0.0)):
+        if xs and x == xs[-1]:
+            vr[-1] = y
+        else:
+            xs.append(x)
+            vl.append(y)
+            vr.append(y)
+    return np.array(xs), np.array(vl), np.array(vr)
+
+def _limits(env, q):
+    """Limit kiri dan kanan kurva (xs, vl, vr) di titik q; 0 di luar [xs[0], xs[-1]]."""
+    xs, vl, vr = env
+    i = xs.searchsorted(q, side='right') - 1
+    j = np.minimum(np.maximum(i, 0), xs.size - 2)
+    # xs unik, jadi lebar interval tidak pernah nol
+    v = vr[j] + (q - xs[j]) / (xs[j + 1] - xs[j]) * (vl[j + 1] - vr[j])
+    v[(i < 0) | (i >= xs.size - 1)] = 0.0
+    left, right = v, v.copy()
+    hit = (i >= 0) & (xs[np.maximum(i, 0)] == q)
+    left[hit], right[hit] = vl[i[hit]], vr[i[hit]]
+    return left, right
+
+def _envelope_max(f, g):
+    """
+    Maksimum dua kurva piecewise-linear (xs, vl, vr) dalam waktu linear:
+    gabungan titik patah keduanya ditambah titik potong di dalam setiap
+    interval tempat urutan kedua kurva bertukar.
+    """
+    xs = np.union1d(f[0], g[0])
+    fl, fr = _limits(f, xs)
+    gl, gr = _limits(g, xs)
+    d0, d1 = fr[:-1] - gr[:-1], fl[1:] - gl[1:]
+    k = np.flatnonzero(d0 * d1 < 0)
+    t = d0[k] / (d0[k] - d1[k])
+    xc = xs[k] + t * (xs[k + 1] - xs[k])
+    vc = fr[k] + t * (fl[k + 1] - fr[k])
+    inside = (xc > xs[k]) & (xc < xs[k + 1])
+    x = np.concatenate([xs, xc[inside]])
+    order = np.argsort(x, kind='stable')
+    vc = vc[inside]
+    return (x[order], np.concatenate([np.maximum(fl, gl), vc])[order],
+            np.concatenate([np.maximum(fr, gr), vc])[order])
+
+def _envelope_segments(alpha, params, universe):
+    """
+    Titik patah kurva agregasi max_d min(alpha_d, trimf_d) di dalam semesta.
+    Di antara dua titik patah berurutan kurva agregasi linear, sehingga
+    integralnya bisa dihitung eksak. Envelope dibangun dengan menggabungkan
+    trapesium terpotong berpasangan (divide and conquer, lihat
+    _envelope_max): log D tingkat, masing-masing linear dalam jumlah titik
+    patah, jadi O(D log D) untuk D himpunan aktif (ditambah titik potong
+    envelope yang benar-benar ada).
+    Returns:
+        x: Titik patah terurut
+        v_left, v_right: Nilai limit kurva di ujung kiri/kanan setiap segmen
+    """
+    lo, hi = universe
+    h = _clipped_heights(alpha)
+    active = (h > 0) & (params[:, 0] < params[:, 2])
+    envs = [_trapezoid(a, b, c, hd) for (a, b, c), hd in zip(params[active].tolist(), h[active].tolist())]
+    if not envs:
+        return np.array([lo, hi], dtype=float), np.zeros(1), np.zeros(1)
+    while len(envs) > 1:
+        envs = [_envelope_max(*envs[i:i + 2]) if i + 1 < len(envs) else envs[i] for i in range(0, len(envs), 2)]
+    xs = envs[0][0]
+    x = np.concatenate([[lo], xs[(xs > lo) & (xs < hi)], [hi]]).astype(float)
+    left, right = _limits(envs[0], x)
+    return x, right[:-1], left[1:]
+
+def _maxima_interval(alpha, params, universe):
+    """Tinggi maksimum H serta titik maksimum paling kiri dan paling kanan."""
+    lo, hi = universe
+    h = _clipped_heights(alpha)
+    top = h.max() if h.size else 0.0
+    if top == 0:
+        return 0.0, None, None
+    at_top = h == top
+    left, right = _plateaus(top, params[at_top])
+    return top, max(left.min(), lo), min(right.max(), hi)
+
+def defuzzify_analytic(alpha, params, method="mom", universe=(0.0, 10.0)):
+    """
+    Defuzzifikasi eksak tanpa grid dari alpha per himpunan output segitiga.
+    mom/som/lom/wavg dihitung dalam O(D) dari interval datar segitiga yang
+    dipotong (D = jumlah himpunan aktif). centroid/bisector mengintegralkan
+    secara eksak envelope agregasi yang linear per potong, dibangun dalam
+    O(D log D) (lihat _envelope_segments), tanpa bergantung pada resolusi grid.
+    Args:
+        alpha: Array (D,) firing strength per himpunan output
+        params: Array (D, 3) parameter (a,b,c) himpunan output
+        method: Salah satu kunci DEFUZZ_LABELS, atau "all" untuk semua metode
+        universe: Batas (bawah, atas) semesta output
+    Returns:
+        Nilai crisp (0.0 jika tidak ada himpunan yang aktif), atau
+        Dictionary metode -> nilai crisp jika method="all"
+    """
+    params = np.asarray(params, dtype=float).reshape(-1, 3)
+    if method == "all":
+        return {m: defuzzify_analytic(alpha, params, m, universe) for m in DEFUZZ_LABELS}
+    if method == "wavg":
+        return _weighted_average(_clipped_heights(alpha), params[:, 1])
+    if method in ("mom", "som", "lom"):
+        top, left, right = _maxima_interval(alpha, params, universe)
+        if top == 0:
+            return 0.0
+        if method == "som":
+            return float(left)
+        if method == "lom":
+            return float(right)
+        return float((left + right) / 2)
+
+    if method not in ("centroid", "bisector"):
+        raise ValueError(f"Unknown analytic defuzzification method: {method}")
+    x, v1, v2 = _envelope_segments(alpha, params, universe)
+    width = np.diff(x)
+    area = width * (v1 + v2) / 2
+    total = area.sum()
+    if total == 0:
+        return 0.0
+    if method == "centroid":
+        moment = width * (v1 * (2 * x[:-1] + x[1:]) + v2 * (x[:-1] + 2 * x[1:])) / 6
+        return float(moment.sum() / total)
+
+    # Bisector: cari segmen tempat luas kumulatif mencapai setengah total,
+    # lalu selesaikan v1*t + s*t^2/2 = sisa luas di dalam segmen tersebut.
+    cum = np.cumsum(area)
+    k = int(np.searchsorted(cum, total / 2))
+    rem = total / 2 - (cum[k - 1] if k else 0.0)
+    s = (v2[k] - v1[k]) / width[k]
+    if abs(s) < 1e-12:
+        t = rem / v1[k]
+    else:
+        t = (-v1[k] + np.sqrt(v1[k] ** 2 + 2 * s * rem)) / s
+    return float(x[k] + t)
+
+def fuzzy_inference_analytic(inputs, compiled, output_mf, method="mom", universe=(0.0, 10.0)):
+    """
+    Inferensi Mamdani berbobot dengan defuzzifikasi analitik: tidak ada
+    grid y_domain sama sekali. Firing strength sebanding dengan jumlah
+    kondisi rule; biaya defuzzifikasi lihat defuzzify_analytic.
+    Returns:
+        z_star: Nilai crisp eksak
+        per_disease: Dictionary puncak kurva output terpotong per penyakit
+            (bisa langsung dipakai get_top_diagnoses)
+        alpha: Array firing strength per penyakit (urutan compiled.diseases)
+    """
+    mu = fuzzify_vector(inputs, compiled)
+    alpha = disease_strengths(compiled, rule_strengths(compiled, mu))
+    params = np.array([output_mf[d] for d in compiled.diseases], dtype=float).reshape(-1, 3)
+    z_star = defuzzify_analytic(alpha, params, method, universe)
+    per_disease = dict(zip(compiled.diseases, _clipped_heights(alpha)))
+    return z_star, per_disease, alpha
+
+# --- 8. Cache Hasil Diagnosis ---
+class DiagnosisCache:
+    """
+    Cache LRU berukuran terbatas untuk hasil diagnosis.
+    Kuncinya adalah versi knowledge base ditambah vektor input yang
+    dikuantisasi ke kelipatan step (resolusi number_input). Nilai di luar
+    grid step dipakai apa adanya, jadi tidak pernah tertukar dengan nilai lain.
+    Aman dipakai bersama oleh banyak sesi/thread.
+    """
+
+    def __init__(self, maxsize=4096, step=0.1):
+        self.maxsize = maxsize
+        self.step = step
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, inputs, version):
+        items = []
+        for name in sorted(inputs):
+            x = float(inputs[name])
+            q = x / self.step
+            if not math.isfinite(q):
+                # NaN, inf atau nilai raksasa: repr stabil antar panggilan (NaN != NaN)
+                items.append((name, repr(x)))
+                continue
+            q = round(q)
+            items.append((name, q if abs(q * self.step - x) <= 1e-9 else x))
+        return (version, tuple(items))
+
+    def get_or_compute(self, inputs, version, compute):
+        """
+        Mengembalikan hasil tersimpan untuk input ini, atau memanggil
+        compute() lalu menyimpannya. Hasil dibagi antar pemanggil, jadi
+        jangan diubah.
+        """
+        key = self.key(inputs, version)
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                if INSTRUMENTATION.enabled:
+                    INSTRUMENTATION.count("cache_hits")
+                return self._data[key]
+            self.misses += 1
+        if INSTRUMENTATION.enabled:
+            INSTRUMENTATION.count("cache_misses")
+        result = compute()
+        with self._lock:
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return result
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+# --- 9. Skor Top-N dan Antarmuka Front-End ---
+def get_top_diagnoses(per_disease, y_domain, n=3):
+    """
+    Mengambil n penyakit dengan puncak kurva output terpotong tertinggi.
+    Returns:
+        List tuple (penyakit, mu, persentase); persentase dinormalisasi
+        terhadap total n teratas
+    """
+    scores = {}
+    for disease, mu in per_disease.items():
+        max_mu = np.max(mu)
+        if max_mu > 0:
+            scores[disease] = max_mu
+    sorted_top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:n]
+    top_total = sum(v for _, v in sorted_top)
+    return [(d, v, 100 * v / top_total if top_total else 0) for d, v in sorted_top]
+
+def diagnose(inputs, compiled, output_mf, y_domain, method="mom", n=3):
+    """
+    Satu pintu diagnosis untuk front-end: inferensi rule aktif lalu top-n.
+    Args:
+        method: Kunci DEFUZZ_LABELS atau "all" (defuzzifikasi grid di atas
+            y_domain), atau dengan awalan "exact_" (misalnya "exact_centroid")
+            untuk defuzzifikasi analitik di semesta [y_domain[0], y_domain[-1]]
+    Returns:
+        z_star: Nilai crisp (Dictionary jika method="all")
+        top: List tuple (penyakit, mu, persentase), lihat get_top_diagnoses
+    """
+    base, analytic = split_method(method)
+    if analytic:
+        universe = (float(y_domain[0]), float(y_domain[-1]))
+        z_star, per_disease, alpha = fuzzy_inference_analytic(inputs, compiled, output_mf, base, universe)
+    else:
+        z_star, per_disease, aggregated = fuzzy_inference_sparse(inputs, compiled, output_mf, y_domain, method)
+    inst = INSTRUMENTATION if INSTRUMENTATION.enabled else None
+    t = inst.start() if inst else 0
+    top = get_top_diagnoses(per_disease, y_domain, n)
+    if inst:
+        inst.count("diagnoses")
+        inst.stage("top_n", t, top=top)
+    return z_star, top
+
+def fuzzy_inference_confidence_weighted(inputs, mf, rules, trace=None):
+    """
+    Skor kepercayaan berbobot dengan boost berdasarkan jumlah kondisi yang
+    cocok: strength = sum(mu * w) * (1 + cocok / jumlah kondisi).
+    Args:
+        trace: InferenceTrace opsional yang diisi mu, bobot dan kontribusi
+            setiap kondisi; tidak ada teks yang diformat di sini
+    Returns:
+        fuzzy_vals: Nilai fuzzy untuk setiap variabel
+        raw_degrees: Strength ter-boost untuk setiap penyakit
+    """
+    fuzzy_vals = {}
+    for var, x in inputs.items():
+        fuzzy_vals[var] = {}
+        for setn, params in mf.get(var, {}).items():
+            fuzzy_vals[var][setn] = membership(x, params)
+    if trace is not None:
+        trace.start("confidence", inputs, fuzzy_vals)
+
+    raw_degrees = {}
+    for conds, weights, disease in rules:
+        mus = [fuzzy_vals.get(var, {}).get(setn, 0.0) for var, setn in map(var_and_set_name, conds)]
+        base_strength = 0.0
+        match_count = 0
+        for mu, w in zip(mus, weights):
+            if mu > 0:
+                match_count += 1
+            base_strength += mu * w
+        match_ratio = match_count / len(conds) if conds else 0
+        boosted_strength = base_strength * (1 + match_ratio)
+        raw_degrees[disease] = boosted_strength
+        if trace is not None:
+            trace.add_rule(disease, conds, mus, weights, base_strength, match_count, boosted_strength)
+
+    return fuzzy_vals, raw_degrees
+
+def normalize_top_n(raw_degrees, n=3):
+    """
+    Menormalisasi dan mengambil n hasil teratas.
+    Returns:
+        confidences: Dictionary persentase kepercayaan
+        top_n: List n penyakit teratas (kosong jika tidak ada yang cocok)
+    """
+    sorted_raw = sorted(raw_degrees.items(), key=lambda x: -x[1])
+    top_n = [d for d, _ in sorted_raw][:n]
+    total_top = sum(raw_degrees[d] for d in top_n)
+    if total_top > 0:
+        return {d: (raw_degrees[d] / total_top) * 100 if d in top_n else 0.0 for d in raw_degrees}, top_n
+    return {d: 0.0 for d in raw_degrees}, []
+
+# --- 10. Instrumentasi ---
+class Instrumentation:
+    """
+    Timer dan counter per tahap inferensi, plus hook opsional.
+    Tahap: fuzzify, rules, implication, aggregation, defuzzify, top_n.
+    Counter: rules_evaluated, rules_skipped, cache_hits, cache_misses, diagnoses.
+    Saat nonaktif, jalur inferensi hanya memeriksa atribut enabled sekali
+    per panggilan, jadi aman dibiarkan terpasang di produksi.
+    Hook dipanggil sebagai fn(stage, elapsed_ns, payload) dengan payload
+    berisi array hasil tahap itu (jangan diubah).
+    """
+
+    STAGES = ("fuzzify", "rules", "implication", "aggregation", "defuzzify", "top_n")
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._hooks = {}
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+        return self
+
+    def disable(self):
+        self.enabled = False
+        return self
+
+    def add_hook(self, stage, fn):
+        """Mendaftarkan fn untuk satu tahap, atau "*" untuk semua tahap."""
+        if stage != "*" and stage not in self.STAGES:
+            raise ValueError(f"Unknown inference stage: {stage}")
+        self._hooks.setdefault(stage, []).append(fn)
+        return fn
+
+    def remove_hook(self, stage, fn):
+        self._hooks.get(stage, []).remove(fn)
+
+    def start(self):
+        return time.perf_counter_ns()
+
+    def stage(self, name, start, **payload):
+        """
+        Mencatat durasi tahap sejak start dan memanggil hook-nya.
+        Mengembalikan waktu sekarang sebagai start tahap berikutnya
+        (waktu yang dipakai hook tidak ikut terhitung).
+        """
+        elapsed = time.perf_counter_ns() - start
+        with self._lock:
+            calls, total, worst = self._timings.get(name, (0, 0, 0))
+            self._timings[name] = (calls + 1, total + elapsed, max(worst, elapsed))
+        for fn in self._hooks.get(name, []) + self._hooks.get("*", []):
+            fn(name, elapsed, payload)
+        return time.perf_counter_ns()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + int(n)
+
+    def snapshot(self):
+        """Salinan timer (ms) dan counter saat ini."""
+        with self._lock:
+            timings = {
+                name: {
+                    "calls": calls,
+                    "total_ms": total / 1e6,
+                    "mean_ms": total / calls / 1e6,
+                    "max_ms": worst / 1e6,
+                }
+                for name, (calls, total, worst) in self._timings.items()
+            }
+            return {"timings": timings, "counters": dict(self._counters)}
+
+    def reset(self):
+        with self._lock:
+            self._timings = {}
+            self._counters = {}
+
+INSTRUMENTATION = Instrumentation()
+
+# --- 11. Jejak Penjelasan ---
+ConditionTrace = namedtuple("ConditionTrace", [
+    "condition",     # Token kondisi asli, misalnya "batuk_berat"
+    "mu",            # Derajat keanggotaan input pada set kondisi
+    "weight",        # Bobot kondisi (belum dinormalisasi)
+    "contribution",  # mu * weight
+])
+
+RuleTrace = namedtuple("RuleTrace", [
+    "disease",     # Nama penyakit konsekuen
+    "conditions",  # Tuple ConditionTrace
+    "strength",    # Alpha (Mamdani) atau base strength (confidence)
+    "matches",     # Jumlah kondisi dengan mu > 0
+    "boosted",     # Strength setelah boost (hanya confidence), selain itu None
+])
+
+class InferenceTrace:
+    """
+    Jejak inferensi terstruktur yang diisi oleh fungsi inferensi jika
+    diberikan lewat argumen trace. Saat inferensi hanya tuple angka yang
+    disimpan; teks baru diformat ketika lines() / render() dipanggil.
+    """
+
+    def __init__(self):
+        self.kind = None
+        self.inputs = {}
+        self.fuzzy = {}
+        self.rules = []
+
+    def start(self, kind, inputs, fuzzy_vals):
+        self.kind = kind
+        self.inputs = dict(inputs)
+        self.fuzzy = fuzzy_vals
+        self.rules = []
+
+    def add_rule(self, disease, conds, mus, weights, strength, matches=None, boosted=None):
+        conditions = tuple(ConditionTrace(c, mu, w, mu * w) for c, mu, w in zip(conds, mus, weights))
+        if matches is None:
+            matches = sum(1 for c in conditions if c.mu > 0)
+        self.rules.append(RuleTrace(disease, conditions, strength, matches, boosted))
+
+    def for_disease(self, disease):
+        """Semua jejak rule untuk satu penyakit, strength tertinggi lebih dulu."""
+        return sorted((r for r in self.rules if r.disease == disease), key=lambda r: -r.strength)
+
+    def lines(self):
+        """Baris teks pelacakan (format sama dengan print tracing lama), dibuat saat diiterasi."""
+        confidence = self.kind == "confidence"
+        yield "\n=== Fuzzifikasi (Membership Degrees) ===" if confidence else "\n=== Fuzzifikasi ==="
+        for var, x in self.inputs.items():
+            yield f"\n>> Gejala: {var} (nilai: {x})" if confidence else f"\n>> Gejala: {var} (input: {x})"
+            for setn, mu in self.fuzzy.get(var, {}).items():
+                yield f"   - {setn}: μ = {mu:.3f}"
+        if not confidence:
+            yield "\n=== Evaluasi Rule, Implikasi, dan Agregasi ==="
+            for r in self.rules:
+                yield f"\n>> {r.disease} → α = {r.strength:.3f}"
+            return
+        yield "\n=== Perhitungan Strength dengan Boost Berdasarkan Kecocokan ==="
+        for r in self.rules:
+            yield f"\n>> Rule untuk Diagnosis: {r.disease}"
+            for c in r.conditions:
+                yield f"   - {c.condition}: μ = {c.mu:.3f}, bobot = {c.weight:.2f}, kontribusi = {c.contribution:.3f}"
+            yield (f"   => Base Strength = {r.strength:.3f}, Matches = {r.matches}/{len(r.conditions)}, "
+                   f"Boosted = {r.boosted:.3f}")
+
+    def render(self):
+        return "\n".join(self.lines())
+
+def explain_rules(inputs, compiled, diseases=None):
+    """
+    Membangun jejak Mamdani hanya untuk rule penyakit yang diminta, dari
+    rule base terkompilasi. Dipakai untuk panel "mengapa diagnosis ini"
+    setelah hasil didapat, sehingga jalur inferensi biasa tidak ikut menanggungnya.
+    Kondisi yang tidak dikenal bernilai mu = 0 seperti saat kompilasi.
+    Returns:
+        InferenceTrace
+    """
+    mu = fuzzify_vector(inputs, compiled)
+    fuzzy_vals = {}
+    for (g, setn), value in zip(compiled.columns, mu):
+        if g in inputs:
+            fuzzy_vals.setdefault(g, {})[setn] = float(value)
+    trace = InferenceTrace()
+    trace.start("mamdani", {g: inputs[g] for g in compiled.symptoms if g in inputs}, fuzzy_vals)
+    wanted = None if diseases is None else set(diseases)
+    for conds, weights, disease in compiled.rules:
+        if wanted is not None and disease not in wanted:
+            continue
+        mus = []
+        for cond in conds:
+            j = compiled.column_index.get(var_and_set_name(cond))
+            mus.append(0.0 if j is None else float(mu[j]))
+        total = sum(weights)
+        alpha = sum(m * w for m, w in zip(mus, weights)) / total if conds and total else 0.0
+        trace.add_rule(disease, conds, mus, weights, alpha)
+    return trace
+
+# --- 12. Inferensi Inkremental ---
+class IncrementalInference:
+    """
+    Inferensi Mamdani berbobot yang menyimpan vektor keanggotaan, alpha per
+    rule, alpha per penyakit dan kurva terpotong per penyakit, sehingga
+    perubahan satu gejala hanya menghitung ulang set gejala itu, rule yang
+    merujuknya (indeks CSC column_ptr/column_rules) dan penyakit yang alphanya
+    benar-benar berubah. Hasil sama persis dengan diagnose, termasuk untuk
+    input NaN (gejala kosong) dan inf (di luar semesta). Tidak aman dipakai
+    bersama antar thread; buat satu instance per sesi.
+    """
+
+    def __init__(self, compiled, output_mf, y_domain, inputs=None, method="mom", n=3):
+        self.compiled = compiled
+        self.output_mf = output_mf
+        self.y_domain = np.asarray(y_domain, dtype=float)
+        self.method = method
+        self.n = n
+        self._symptom_index = {g: i for i, g in enumerate(compiled.symptoms)}
+        # Kolom setiap gejala berurutan (lihat compile_rule_base), jadi cukup batas awal/akhirnya
+        self._symptom_ptr = np.searchsorted(compiled.column_symptom, np.arange(len(compiled.symptoms) + 1))
+        counts = np.bincount(compiled.rule_disease, minlength=len(compiled.diseases))
+        self._disease_ptr = np.zeros(len(compiled.diseases) + 1, dtype=np.intp)
+        np.cumsum(counts, out=self._disease_ptr[1:])
+        self._disease_rules = np.argsort(compiled.rule_disease, kind='stable').astype(np.intp)
+
+        names, index, curves = output_set_curves(output_mf, self.y_domain)
+        if compiled.diseases:
+            self._curves = curves[[index[d] for d in compiled.diseases]]
+        else:
+            self._curves = np.zeros((0, self.y_domain.size))
+        self._peaks = self._curves.max(axis=1) if compiled.diseases else np.zeros(0)
+        self._centers = [output_mf[d][1] for d in compiled.diseases]
+        self._params = np.array([output_mf[d] for d in compiled.diseases], dtype=float).reshape(-1, 3)
+        self.reset(inputs or {})
+
+    def reset(self, inputs):
+        """Menghitung ulang seluruh keadaan dari inputs (Dictionary gejala -> nilai)."""
+        c = self.compiled
+        self.x = np.full(len(c.symptoms), np.nan)
+        for g, v in inputs.items():
+            i = self._symptom_index.get(g)
+            if i is not None and v is not None:
+                self.x[i] = float(v)
+        self.mu = symptom_memberships(self.x, c)
+        self.rule_alpha = rule_strengths(c, self.mu)
+        self.alpha = disease_strengths(c, self.rule_alpha)
+        self.clipped = np.minimum(self.alpha[:, None], self._curves)
+        self.aggregated = self.clipped.max(axis=0) if c.diseases else np.zeros_like(self.y_domain)
+        self.changed = list(c.diseases)
+        self._result = None
+
+    @property
+    def inputs(self):
+        return {g: float(v) for g, v in zip(self.compiled.symptoms, self.x) if not np.isnan(v)}
+
+    def _fuzzify_symptom(self, i, value):
+        c, lut = self.compiled, self.compiled.lut
+        lo, hi = self._symptom_ptr[i], self._symptom_ptr[i + 1]
+        # NaN/inf (dan nilai raksasa yang pembagiannya meluap) tidak punya baris tabel
+        pos = (value - float(lut.lo[i])) / lut.step if lut is not None and math.isfinite(value) else math.nan
+        if math.isfinite(pos):
+            idx = int(np.rint(pos))
+            if 0 <= idx < lut.size[i] and lut.grid[lut.offset[i] + idx] == value:
+                return lut.table[lut.offset[i] + idx, lo:hi]
+        return pwl_columns(np.full(hi - lo, value), c.set_x[lo:hi], c.set_y[lo:hi])
+
+    def update(self, symptom, value):
+        """
+        Mengubah satu input (None berarti gejala tidak diisi). Gejala yang
+        tidak dikenal diabaikan, sama seperti fuzzify_vector.
+        Returns:
+            List nama penyakit yang alphanya berubah (kosong jika hasil tetap)
+        """
+        c = self.compiled
+        i = self._symptom_index.get(symptom)
+        value = np.nan if value is None else float(value)
+        if i is None or self.x[i] == value or (np.isnan(self.x[i]) and np.isnan(value)):
+            self.changed = []
+            return self.changed
+        self.x[i] = value
+
+        lo = self._symptom_ptr[i]
+        new_mu = self._fuzzify_symptom(i, value)
+        cols = lo + np.flatnonzero(new_mu != self.mu[lo:lo + new_mu.size])
+        self.mu[lo:lo + new_mu.size] = new_mu
+        rules = np.unique(_gather(c.column_ptr, c.column_rules, cols))
+        inst = INSTRUMENTATION if INSTRUMENTATION.enabled else None
+        if inst:
+            inst.count("rules_evaluated", rules.size)
+            inst.count("rules_skipped", len(c.rule_disease) - rules.size)
+        if not rules.size:
+            self.changed = []
+            return self.changed
+        self.rule_alpha[rules] = rule_strengths(c, self.mu, rules)
+
+        # Alpha baru = maksimum alpha rule milik setiap penyakit yang tersentuh
+        diseases = np.unique(c.rule_disease[rules])
+        members = _gather(self._disease_ptr, self._disease_rules, diseases)
+        lengths = self._disease_ptr[diseases + 1] - self._disease_ptr[diseases]
+        alpha = np.maximum(np.maximum.reduceat(self.rule_alpha[members], np.cumsum(lengths) - lengths), 0.0)
+        moved = alpha != self.alpha[diseases]
+        diseases, alpha = diseases[moved], alpha[moved]
+        if diseases.size:
+            grew = bool((alpha >= self.alpha[diseases]).all())
+            self.alpha[diseases] = alpha
+            self.clipped[diseases] = np.minimum(alpha[:, None], self._curves[diseases])
+            if grew:
+                np.maximum(self.aggregated, self.clipped[diseases].max(axis=0), out=self.aggregated)
+            else:
+                self.aggregated = self.clipped.max(axis=0)
+            self._result = None
+        self.changed = [c.diseases[j] for j in diseases]
+        return self.changed
+
+    def update_many(self, inputs):
+        """
+        Menerapkan inputs (Dictionary gejala -> nilai) lewat update, hanya
+        untuk gejala yang nilainya berbeda dari keadaan sekarang.
+        Returns:
+            List nama penyakit yang alphanya berubah
+        """
+        changed = []
+        for g, v in inputs.items():
+            for d in self.update(g, v):
+                if d not in changed:
+                    changed.append(d)
+        self.changed = changed
+        return changed
+
+    @property
+    def per_disease(self):
+        return dict(zip(self.compiled.diseases, self.clipped))
+
+    def result(self):
+        """
+        Hasil untuk keadaan sekarang, dihitung ulang hanya setelah ada alpha yang berubah.
+        Returns:
+            z_star, top (sama seperti diagnose)
+        """
+        if self._result is None:
+            base, analytic = split_method(self.method)
+            if analytic:
+                universe = (float(self.y_domain[0]), float(self.y_domain[-1]))
+                z_star = defuzzify_analytic(self.alpha, self._params, base, universe)
+            else:
+                z_star = defuzzify(self.y_domain, self.aggregated, self.method, self.alpha, self._centers)
+            scores = np.minimum(self.alpha, self._peaks)
+            order = [j for j in np.argsort(-scores, kind='stable')[:self.n] if scores[j] > 0]
+            top_total = sum(scores[j] for j in order)
+            top = [(self.compiled.diseases[j], scores[j], 100 * scores[j] / top_total if top_total else 0)
+                   for j in order]
+            self._result = (z_star, top)
+        return self._result
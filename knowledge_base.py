@@ -0,0 +1,364 @@
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from fuzzy_engine import (CompiledRuleBase, compile_rule_base, pad_rule_conditions, register_output_curves,
+                          with_membership_lut)
+
+# --- 1. Tanda Tangan File Knowledge Base ---
+_HASH_MEMO = {}
+
+def file_signature(path):
+    """
+    Tanda tangan file: (path absolut, mtime_ns, ukuran, hash isi SHA-256).
+    Hash isi hanya dihitung ulang jika mtime atau ukuran berubah, jadi
+    pemanggilan berulang cukup satu os.stat.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    digest = _HASH_MEMO.get(key)
+    if digest is None:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        _HASH_MEMO[key] = digest
+    return key + (digest,)
+
+def knowledge_base_version(*paths):
+    """
+    Versi knowledge base dari gabungan mtime dan hash isi semua file.
+    Berubah jika salah satu file diubah, sehingga bisa dipakai sebagai
+    kunci invalidasi cache.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        _, mtime_ns, size, digest = file_signature(path)
+        h.update(f"{mtime_ns}:{size}:{digest};".encode())
+    return h.hexdigest()[:16]
+
+# --- 2. Parser Literal List ---
+_ITEM = r"""(?:'[^'\\\n]*'|"[^"\\\n]*"|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"""
+_LIST_RE = re.compile(rf"\s*\[\s*(?:{_ITEM}\s*(?:,\s*{_ITEM}\s*)*,?\s*)?\]\s*")
+_ITEM_RE = re.compile(_ITEM)
+_INT_RE = re.compile(r"[-+]?\d+")
+
+def parse_list_literal(text):
+    """
+    Parser cepat dan aman untuk literal list datar berisi string
+    atau angka, misalnya "['demam_sedang', 'batuk_berat']" atau "[0.15, 0.10]".
+    Bentuk lain (escape, nested, NaN dari sel kosong) diteruskan ke
+    ast.literal_eval, sehingga pesan error untuk baris rusak tetap sama.
+    """
+    if not isinstance(text, str) or not _LIST_RE.fullmatch(text):
+        import ast
+        return ast.literal_eval(text)
+    items = []
+    for tok in _ITEM_RE.findall(text):
+        if tok[0] in "'\"":
+            items.append(tok[1:-1])
+        elif _INT_RE.fullmatch(tok):
+            items.append(int(tok))
+        else:
+            items.append(float(tok))
+    return items
+
+# --- 3. Loader CSV Kolumnar ---
+def read_csv_columns(path, columns):
+    """
+    Membaca kolom-kolom tertentu dari file CSV dengan modul csv pustaka
+    standar. File knowledge base hanya puluhan baris, jadi pandas (yang
+    impornya jauh lebih lama dari membacanya) tidak diperlukan. Sel kosong
+    menjadi NaN seperti pd.read_csv; kolom yang tidak ada memunculkan KeyError.
+    Returns:
+        List kolom, masing-masing List nilai string (atau NaN) per baris
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise KeyError(f"{missing} not in index")
+        index = [header.index(c) for c in columns]
+        out = [[] for _ in columns]
+        for row in reader:
+            if not row:
+                continue
+            row = row + [""] * (len(header) - len(row))
+            for values, i in zip(out, index):
+                values.append(row[i] if row[i] != "" else float("nan"))
+    return out
+
+def load_membership_functions(path, shape="triangle"):
+    """
+    Memuat fungsi keanggotaan dari file CSV secara kolumnar.
+    Args:
+        shape: "triangle" membentuk segitiga dari kolom first/second (titik
+            puncak di tengah); "trapezoid" memakai kolom a,b,c,d apa adanya
+            (a == b atau c == d menjadi shoulder)
+    Returns:
+        mf: Dictionary fungsi keanggotaan
+        cmap: Pemetaan kategori gejala
+    """
+    if shape == "triangle":
+        groups, names, sets, first, second = read_csv_columns(
+            path, ['kategori', 'Gejala', 'Kategori', 'first', 'second'])
+        a = np.array(first, dtype=float)
+        c = np.array(second, dtype=float)
+        params = np.column_stack([a, (a + c) / 2.0, c]).tolist()
+    elif shape == "trapezoid":
+        groups, names, sets, *corners = read_csv_columns(
+            path, ['kategori', 'Gejala', 'Kategori', 'a', 'b', 'c', 'd'])
+        params = np.array(corners, dtype=float).T.tolist()
+    else:
+        raise ValueError(f"Unknown membership shape: {shape}")
+    mf, cmap = {}, {}
+    for grp, g, setn, p in zip(groups, names, sets, params):
+        mf.setdefault(g, {})[setn] = tuple(p)
+        cmap.setdefault(grp, set()).add(g)
+    return mf, cmap
+
+def load_rules_with_weights(path, mf=None, on_error=print, on_warning=print):
+    """
+    Memuat aturan fuzzy dan bobotnya dari file CSV secara kolumnar.
+    Baris yang rusak dilewati dengan pesan yang sama seperti loader lama.
+    Args:
+        mf: Jika diberikan, rule langsung dikompilasi terhadap fungsi keanggotaan ini
+        on_error, on_warning: Fungsi pelapor (print, st.error, st.warning, ...)
+    Returns:
+        rules: List tuple (kondisi, bobot, nama_penyakit),
+            atau CompiledRuleBase jika mf diberikan
+    """
+    rules = []
+    for name, vars_text, weights_text in zip(*read_csv_columns(path, ['nama_penyakit', 'vars', 'weights'])):
+        try:
+            conds = parse_list_literal(vars_text)
+            weights = list(map(float, parse_list_literal(weights_text)))
+        except Exception as e:
+            on_error(f"Error parsing rule for {name}: {e}")
+            continue
+        if len(weights) != len(conds):
+            on_warning(f"Skipping rule {name} due to length mismatch.")
+            continue
+        rules.append((conds, weights, name))
+    if mf is not None:
+        return compile_rule_base(rules, mf)
+    return rules
+
+def load_output_membership(path):
+    """
+    Memuat himpunan output per penyakit dari file CSV secara kolumnar.
+    Returns:
+        output_mf: Dictionary nama penyakit -> parameter segitiga (a,b,c)
+    """
+    names, *corners = read_csv_columns(path, ['penyakit', 'a', 'b', 'c'])
+    params = np.array(corners, dtype=float).T.tolist()
+    return {d: tuple(p) for d, p in zip(names, params)}
+
+# --- 4. Bundel Knowledge Base ---
+KnowledgeBase = namedtuple("KnowledgeBase", [
+    "mf",         # Dictionary fungsi keanggotaan gejala
+    "cmap",       # Pemetaan kategori gejala
+    "rules",      # CompiledRuleBase
+    "output_mf",  # Dictionary himpunan output per penyakit
+    "y_domain",   # Semesta output (read-only)
+    "version",    # Versi knowledge base (knowledge_base_version saat dimuat/diekspor)
+])
+
+Y_DOMAIN = (0.0, 10.0, 1000)
+
+def load_knowledge_base_csv(mf_path, rules_path, output_mf_path, on_error=print, on_warning=print,
+                            lut_step=None, mf_shape="triangle"):
+    """
+    Memuat knowledge base dari ketiga file CSV dan mengompilasi rule-nya.
+    Jika lut_step diberikan, fuzzifikasi memakai tabel lookup beresolusi itu.
+    mf_shape diteruskan ke load_membership_functions.
+    """
+    mf, cmap = load_membership_functions(mf_path, mf_shape)
+    rules = load_rules_with_weights(rules_path, mf, on_error=on_error, on_warning=on_warning)
+    if lut_step:
+        rules = with_membership_lut(rules, lut_step)
+    output_mf = load_output_membership(output_mf_path)
+    y_domain = np.linspace(*Y_DOMAIN)
+    y_domain.setflags(write=False)
+    version = knowledge_base_version(mf_path, rules_path, output_mf_path)
+    return KnowledgeBase(mf, cmap, rules, output_mf, y_domain, version)
+
+# --- 5. Format Biner Terkompilasi ---
+# Tata letak file:
+#   MAGIC (8 byte) | format (u32) | panjang header (u32) | awal data (u64)
+#   header JSON (metadata + offset/dtype/shape setiap array)
+#   blok data: array little-endian, masing-masing sejajar 64 byte
+KB_MAGIC = b"RSPZKB\0\0"
+KB_FORMAT_VERSION = 4
+_PREAMBLE = struct.Struct("<8sIIQ")
+_ALIGN = 64
+
+def _align(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def export_knowledge_base(kb, path):
+    """
+    Menyimpan KnowledgeBase menjadi satu artefak biner berversi: parameter
+    fungsi keanggotaan, indeks dan bobot rule, parameter himpunan output dan
+    kurva output yang sudah dihitung di atas y_domain.
+    """
+    from fuzzy_engine import output_set_curves
+
+    compiled = kb.rules
+    names, index, curves = output_set_curves(kb.output_mf, kb.y_domain)
+    arrays = {
+        "set_x": compiled.set_x.astype("<f8"),
+        "set_y": compiled.set_y.astype("<f8"),
+        "column_symptom": compiled.column_symptom.astype("<i8"),
+        "rule_disease": compiled.rule_disease.astype("<i8"),
+        "weights": compiled.weights.astype("<f8"),
+        "rule_ptr": compiled.rule_ptr.astype("<i8"),
+        "cond_index": compiled.cond_index.astype("<i8"),
+        "rule_total": compiled.rule_total.astype("<f8"),
+        "column_ptr": compiled.column_ptr.astype("<i8"),
+        "column_rules": compiled.column_rules.astype("<i8"),
+        "output_params": np.array([kb.output_mf[d] for d in names], dtype="<f8").reshape(-1, 3),
+        "y_domain": np.asarray(kb.y_domain, dtype="<f8"),
+        "curves": np.asarray(curves, dtype="<f8"),
+    }
+    layout, offset = {}, 0
+    for name, arr in arrays.items():
+        layout[name] = {"offset": offset, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+        offset = _align(offset + arr.nbytes)
+
+    header = json.dumps({
+        "version": kb.version,
+        "arrays": layout,
+        "symptoms": compiled.symptoms,
+        "columns": compiled.columns,
+        "set_params": compiled.set_params,
+        "cmap": {grp: sorted(gs) for grp, gs in kb.cmap.items()},
+        "diseases": compiled.diseases,
+        "rules": compiled.rules,
+        "output_names": names,
+    }).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(KB_MAGIC, KB_FORMAT_VERSION, len(header), data_start))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+
+def load_knowledge_base_binary(path, lut_step=None):
+    """
+    Memuat artefak biner dengan memory-map tanpa salinan: semua array
+    adalah view read-only ke halaman file yang sama, sehingga banyak proses
+    worker berbagi satu salinan fisik. Tidak membutuhkan pandas maupun ast.
+    Jika lut_step diberikan, fuzzifikasi memakai tabel lookup beresolusi itu.
+    """
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, fmt, header_len, data_start = _PREAMBLE.unpack_from(buf, 0)
+    if magic != KB_MAGIC:
+        raise ValueError(f"{path} is not a compiled knowledge base file")
+    if fmt != KB_FORMAT_VERSION:
+        raise ValueError(f"Unsupported knowledge base format {fmt} (expected {KB_FORMAT_VERSION})")
+    header = json.loads(bytes(buf[_PREAMBLE.size:_PREAMBLE.size + header_len]))
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arr = np.frombuffer(buf, dtype=dtype, count=count, offset=data_start + spec["offset"])
+        arrays[name] = arr.reshape(spec["shape"])
+
+    columns = [tuple(col) for col in header["columns"]]
+    set_params = [tuple(tuple(v) if isinstance(v, list) else v for v in p) for p in header["set_params"]]
+    mf = {}
+    for (g, setn), p in zip(columns, set_params):
+        mf.setdefault(g, {})[setn] = p
+    cmap = {grp: set(gs) for grp, gs in header["cmap"].items()}
+    rule_cols, rule_weights = pad_rule_conditions(arrays["rule_ptr"], arrays["cond_index"], arrays["weights"])
+    rules = CompiledRuleBase(
+        symptoms=header["symptoms"],
+        columns=columns,
+        column_index={col: j for j, col in enumerate(columns)},
+        column_symptom=arrays["column_symptom"],
+        set_params=set_params,
+        set_x=arrays["set_x"],
+        set_y=arrays["set_y"],
+        diseases=header["diseases"],
+        rule_disease=arrays["rule_disease"],
+        weights=arrays["weights"],
+        rule_ptr=arrays["rule_ptr"],
+        cond_index=arrays["cond_index"],
+        rule_total=arrays["rule_total"],
+        rule_cols=rule_cols,
+        rule_weights=rule_weights,
+        column_ptr=arrays["column_ptr"],
+        column_rules=arrays["column_rules"],
+        rules=[(conds, weights, d) for conds, weights, d in header["rules"]],
+    )
+    if lut_step:
+        rules = with_membership_lut(rules, lut_step)
+    names = header["output_names"]
+    output_mf = {d: tuple(p) for d, p in zip(names, arrays["output_params"].tolist())}
+    y_domain = arrays["y_domain"]
+    register_output_curves(output_mf, y_domain, arrays["curves"])
+    return KnowledgeBase(mf, cmap, rules, output_mf, y_domain, header["version"])
+
+# --- 6. Opsi Baris Perintah ---
+def add_kb_arguments(parser, binary=True, lut_step=0.1):
+    """
+    Menambahkan opsi knowledge base yang dipakai bersama semua CLI:
+    --mf/--rules/--output-mf/--mf-shape, --kb (artefak biner, menggantikan
+    file CSV) jika binary, dan --lut-step jika lut_step tidak None (nilai
+    bawaannya). Baca hasilnya dengan load_from_args.
+    """
+    base = os.path.dirname(os.path.abspath(__file__))
+    group = parser.add_argument_group("knowledge base")
+    group.add_argument("--mf", default=os.path.join(base, "revisi_member_function.csv"),
+                       help="CSV fungsi keanggotaan gejala")
+    group.add_argument("--rules", default=os.path.join(base, "rules_bobot_respirasi.csv"),
+                       help="CSV rule berbobot")
+    group.add_argument("--output-mf", default=os.path.join(base, "output_member_function.csv"),
+                       help="CSV himpunan output per penyakit")
+    group.add_argument("--mf-shape", choices=["triangle", "trapezoid"], default="triangle",
+                       help="Bentuk fungsi keanggotaan gejala di --mf")
+    if binary:
+        group.add_argument("--kb", help="Artefak knowledge base biner (dari knowledge_base.py); "
+                                        "menggantikan --mf/--rules/--output-mf")
+    if lut_step is not None:
+        group.add_argument("--lut-step", type=float, default=lut_step,
+                           help="Resolusi tabel lookup keanggotaan (0 untuk menonaktifkan)")
+    return group
+
+def load_from_args(args):
+    """KnowledgeBase dari opsi add_kb_arguments: artefak biner jika --kb diberikan, selain itu file CSV."""
+    lut_step = getattr(args, "lut_step", None)
+    if getattr(args, "kb", None):
+        return load_knowledge_base_binary(args.kb, lut_step=lut_step)
+    return load_knowledge_base_csv(args.mf, args.rules, args.output_mf, lut_step=lut_step, mf_shape=args.mf_shape)
+
+# --- 7. Main: Ekspor Artefak Biner ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor knowledge base CSV menjadi artefak biner terkompilasi.")
+    parser.add_argument("output", help="File artefak biner tujuan, misalnya respirazzy.kb")
+    add_kb_arguments(parser, binary=False, lut_step=None)
+    args = parser.parse_args(argv)
+
+    kb = load_from_args(args)
+    export_knowledge_base(kb, args.output)
+    print(f"Knowledge base {kb.version}: {len(kb.rules.rules)} rule, "
+          f"{len(kb.rules.columns)} kolom keanggotaan -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+from fuzzy_engine import batch_top, diagnose, diagnose_batch, membership_range
+from knowledge_base import add_kb_arguments, load_from_args
+
+# --- 1. Dispatcher Micro-Batching ---
+class MicroBatcher:
+    """
+    Dispatcher asyncio yang mengumpulkan permintaan diagnosis bersamaan
+    lalu mengevaluasinya sekaligus dengan satu panggilan diagnose_batch.
+    Sebuah batch dikirim begitu berisi max_batch permintaan atau ketika
+    max_wait_ms sejak permintaan pertamanya habis, mana yang lebih dulu.
+    Knob:
+        max_batch: Batas ukuran batch; makin besar makin tinggi throughput
+        max_wait_ms: Jendela tunggu; makin kecil makin rendah latensi saat sepi
+        max_queue: Batas antrean (0 = tak terbatas); diagnose() menunggu jika penuh
+        offload: Evaluasi di thread executor agar event loop tetap menerima permintaan
+    """
+
+    def __init__(self, kb, max_batch=64, max_wait_ms=2.0, max_queue=0, top_n=3, offload=True):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.kb = kb
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.max_queue = max_queue
+        self.top_n = top_n
+        self.offload = offload
+        self._queue = None
+        self._task = None
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.requests = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.max_batch_seen = 0
+        self._wait_total = 0.0
+        self._eval_total = 0.0
+
+    async def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(self.max_queue)
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def close(self):
+        """Menyelesaikan permintaan yang masih mengantre lalu menghentikan dispatcher."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def diagnose(self, inputs):
+        """
+        Mendiagnosis satu pasien lewat batch bersama.
+        Returns:
+            z_star: Nilai crisp MoM
+            top: List tuple (penyakit, mu, persentase), lihat get_top_diagnoses
+        """
+        if self._task is None:
+            raise RuntimeError("MicroBatcher is not started")
+        # Validasi di sisi pemanggil, supaya satu input rusak tidak menggagalkan seluruh batch
+        inputs = {g: float(v) for g, v in inputs.items() if v is not None}
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((inputs, future, time.perf_counter()))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _collect(self, first):
+        batch = [first]
+        deadline = asyncio.get_running_loop().time() + self.max_wait_ms / 1000
+        closing = False
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                closing = True
+                break
+            batch.append(item)
+        return batch, closing
+
+    async def _run(self):
+        closing = False
+        while not closing:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch, closing = await self._collect(first)
+            start = time.perf_counter()
+            records = [inputs for inputs, _, _ in batch]
+            try:
+                if self.offload:
+                    res = await asyncio.get_running_loop().run_in_executor(None, self._evaluate, records)
+                else:
+                    res = self._evaluate(records)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            done = time.perf_counter()
+            for i, (_, future, queued) in enumerate(batch):
+                self._wait_total += start - queued
+                if not future.done():
+                    future.set_result((float(res.z_star[i]), batch_top(res, i)))
+            self.requests += len(batch)
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self._eval_total += done - start
+
+    def _evaluate(self, records):
+        return diagnose_batch(records, self.kb.rules, self.kb.output_mf, self.kb.y_domain, top_n=self.top_n)
+
+    def metrics(self):
+        """Kedalaman antrean, ukuran batch dan rata-rata waktu tunggu/evaluasi."""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "mean_wait_ms": 1e3 * self._wait_total / self.requests if self.requests else 0.0,
+            "mean_eval_ms": 1e3 * self._eval_total / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_ms,
+        }
+
+# --- 2. Simulasi Klien Bersamaan ---
+async def simulate(kb, records, concurrency, **knobs):
+    """
+    Menjalankan records lewat MicroBatcher dengan concurrency klien bersamaan.
+    Returns:
+        results, latensi per permintaan (detik), durasi total (detik), metrik
+    """
+    results = [None] * len(records)
+    latencies = np.zeros(len(records))
+    next_index = iter(range(len(records)))
+
+    async with MicroBatcher(kb, **knobs) as batcher:
+        async def client():
+            for i in next_index:
+                start = time.perf_counter()
+                results[i] = await batcher.diagnose(records[i])
+                latencies[i] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return results, latencies, elapsed, batcher.metrics()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulasi klien bersamaan lewat dispatcher micro-batching, dibandingkan dengan diagnosis per permintaan.")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-queue", type=int, default=0)
+    parser.add_argument("--inline", action="store_true", help="Evaluasi batch di event loop, bukan di thread executor")
+    parser.add_argument("--seed", type=int, default=0)
+    add_kb_arguments(parser)
+    args = parser.parse_args(argv)
+
+    kb = load_from_args(args)
+
+    rng = np.random.default_rng(args.seed)
+    records = [{g: round(float(rng.uniform(*membership_range(kb.mf[g]))), 1) for g in kb.rules.symptoms}
+               for _ in range(args.requests)]
+
+    start = time.perf_counter()
+    for rec in records:
+        diagnose(rec, kb.rules, kb.output_mf, kb.y_domain)
+    sequential = time.perf_counter() - start
+
+    _, latencies, elapsed, metrics = asyncio.run(simulate(
+        kb, records, args.concurrency, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+        max_queue=args.max_queue, offload=not args.inline))
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    print(f"Per permintaan : {len(records) / sequential:10.1f} diagnosis/s", file=sys.stderr)
+    print(f"Micro-batching : {len(records) / elapsed:10.1f} diagnosis/s "
+          f"(latensi p50 {p50:.2f} ms, p99 {p99:.2f} ms)", file=sys.stderr)
+    for name, value in metrics.items():
+        print(f"  {name:<16} {value:.3f}" if isinstance(value, float) else f"  {name:<16} {value}",
+              file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,4 @@
 import streamlit as st
-import pandas as pd
-import ast
-import numpy as np
-import matplotlib.pyplot as plt
 
 # Ini adalah informasi penyakit yang akan ditampilkan
 DISEASE_INFO = {
@@ -76,140 +72,7 @@ DISEASE_INFO = {
 # Konfigurasi halaman harus menjadi command Streamlit pertama
 st.set_page_config(page_title="Respirazzy", page_icon="🩺", layout="wide")
 
-# --- 1. Memuat Fungsi Keanggotaan ---
-def load_membership_functions(path):
-    """
-    Memuat fungsi keanggotaan dari file CSV.
-    Returns:
-        mf: Dictionary fungsi keanggotaan
-        cmap: Pemetaan kategori gejala
-    """
-    df = pd.read_csv(path)
-    mf, cmap = {}, {}
-    for _, r in df.iterrows():
-        grp, g, setn = r['kategori'], r['Gejala'], r['Kategori']
-        a, c = r['first'], r['second']
-        b = (a + c) / 2.0
-        mf.setdefault(g, {})[setn] = (a, b, c)
-        cmap.setdefault(grp, set()).add(g)
-    return mf, cmap
-
-# --- 2. Memuat Aturan dengan Bobot ---
-def load_rules_with_weights(path):
-    """
-    Memuat aturan fuzzy dan bobotnya dari file CSV.
-    Returns:
-        rules: List tuple (kondisi, bobot, nama_penyakit)
-    """
-    df = pd.read_csv(path, dtype=str)
-    rules = []
-    for _, r in df.iterrows():
-        try:
-            conds = ast.literal_eval(r['vars'])
-            weights = list(map(float, ast.literal_eval(r['weights'])))
-        except Exception as e:
-            st.error(f"Error parsing rule for {r['nama_penyakit']}: {e}")
-            continue
-        if len(weights) != len(conds):
-            st.warning(f"Skipping rule {r['nama_penyakit']} due to length mismatch.")
-            continue
-        rules.append((conds, weights, r['nama_penyakit']))
-    return rules
-
-# --- 3. Triangular Membership Function ---
-def var_and_set_name(tok):
-    """Memisahkan nama variabel dan set dari token"""
-    parts = tok.split('_')
-    return '_'.join(parts[:-1]), parts[-1]
-
-def trimf(x, params):
-    """
-    Menghitung derajat keanggotaan fungsi segitiga.
-    Args:
-        x: Nilai input
-        params: Parameter fungsi segitiga (a,b,c)
-    Returns:
-        Derajat keanggotaan [0,1]
-    """
-    a, b, c = params
-    if a == b == c:
-        return 1.0 if x == a else 0.0
-    if x <= a or x >= c:
-        return 0.0
-    if x <= b:
-        return (x - a) / (b - a)
-    return (c - x) / (c - b)
-
-# --- 4. Implikasi Mamdani ---
-def implication(alpha, params, y):
-    return np.minimum(alpha, np.array([trimf(val, params) for val in y]))
-
-# --- 5. Defuzzifikasi MoM ---
-def defuzzify_mom(y, mu):
-    max_mu = np.max(mu)
-    if max_mu == 0:
-        return 0.0
-    y_max = y[mu == max_mu]
-    return (y_max[0] + y_max[-1]) / 2
-
-# --- 6. Inferensi Fuzzy dengan Bobot dan Pelacakan ---
-def fuzzy_inference_mamdani_weighted(inputs, mf, rules, output_mf, y_domain):
-    """
-    Melakukan inferensi fuzzy dengan bobot dan pelacakan proses.
-    Returns:
-        fuzzy_vals: Nilai fuzzy untuk setiap variabel
-        raw_degrees: Derajat keanggotaan mentah untuk setiap penyakit
-    """
-    fuzzy_vals = {}
-    for var, x in inputs.items():
-        fuzzy_vals[var] = {}
-        for setn, params in mf.get(var, {}).items():
-            mu = trimf(x, params)
-            fuzzy_vals[var][setn] = mu
-
-    aggregated = np.zeros_like(y_domain)
-    per_disease = {}
-
-    for conds, weights, disease in rules:
-        match_vals = []
-        for cond in conds:
-            var, setn = var_and_set_name(cond)
-            mu = fuzzy_vals.get(var, {}).get(setn, 0.0)
-            match_vals.append(mu)
-        if not match_vals:
-            alpha = 0
-        else:
-            alpha = sum(mu * w for mu, w in zip(match_vals, weights)) / sum(weights)
-
-        clipped = implication(alpha, output_mf[disease], y_domain)
-        aggregated = np.maximum(aggregated, clipped)
-        if disease not in per_disease:
-            per_disease[disease] = clipped
-        else:
-            per_disease[disease] = np.maximum(per_disease[disease], clipped)
-
-    z_star = defuzzify_mom(y_domain, aggregated)
-    return z_star, per_disease, aggregated
-
-
-# --- 7. Normalisasi N Teratas ---
-def get_top_diagnoses(per_disease, y_domain):
-    """
-    Menormalisasi dan mengambil n hasil teratas.
-    Returns:
-        confidences: Dictionary persentase kepercayaan
-        top_n: List n penyakit teratas
-    """
-    scores = {}
-    for disease, mu in per_disease.items():
-        max_mu = np.max(mu)
-        if max_mu > 0:
-            scores[disease] = max_mu
-    sorted_top = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3]
-    top_total = sum(v for _, v in sorted_top)
-    return [(d, v, 100 * v / top_total if top_total else 0) for d, v in sorted_top]
-
-# --- 8. Input Gejala dari Pengguna ---
+# --- 1. Input Gejala dari Pengguna ---
 
 label_map = {
     "demam": "Suhu Tubuh (°C)",
@@ -234,6 +97,11 @@ def get_user_inputs(mf, cmap):
     Returns:
     inp: Dictionary nilai input untuk setiap gejala
     """
+    from fuzzy_engine import membership_range
+
+    # Widget yang tidak dirender (misalnya saat pindah halaman) kehilangan nilainya,
+    # jadi nilai terakhir disimpan terpisah di session_state dan dipakai sebagai default
+    saved = st.session_state.get("symptom_values", {})
     inp = {}
     for grp, gs in cmap.items():
         st.subheader(f"{grp.title()}")
@@ -242,8 +110,7 @@ def get_user_inputs(mf, cmap):
         for i, g in enumerate(sorted(gs)):
             if g not in mf:
                 continue
-            pts = [p for (a, b, c) in mf[g].values() for p in (a, b, c)]
-            lo, hi = min(pts), max(pts)
+            lo, hi = membership_range(mf[g])
             default = lo
             step = 0.1 if hi - lo <= 10 else 0.5
             with cols[i % 4]:
@@ -255,12 +122,31 @@ def get_user_inputs(mf, cmap):
                         f"{label} ({lo:.1f}–{hi:.1f})</div>",
                         unsafe_allow_html=True
                     )
-                    value = st.number_input(label="", min_value=lo, max_value=hi, value=default, step=step, key=g)
+                    value = st.number_input(label="", min_value=lo, max_value=hi, value=saved.get(g, default), step=step, key=g)
                     inp[g] = value
                     st.markdown("</div>", unsafe_allow_html=True)
+    st.session_state.symptom_values = inp
     return inp
 
-# --- 7. Program Utama ---
+# --- 2. Kartu Informasi Penyakit ---
+@st.cache_data(show_spinner=False)
+def disease_cards():
+    """HTML kartu setiap penyakit; dirakit sekali, lalu dipakai ulang oleh setiap rerun halaman Informasi."""
+    return [f"""
+            <div class="disease-card">
+                <div class="disease-title">{info['nama']}</div>
+                <div class="section-title">Deskripsi:</div>
+                <div class="info-text">{info['deskripsi']}</div>
+                <div class="section-title">Gejala Utama:</div>
+                <ul class="symptom-list">
+                    {''.join(f'<li class="info-text">{gejala}</li>' for gejala in info['gejala'])}
+                </ul>
+                <div class="section-title">Penanganan:</div>
+                <div class="info-text">{info['penanganan']}</div>
+            </div>
+            """ for info in DISEASE_INFO.values()]
+
+# --- 3. Program Utama ---
 if __name__ == "__main__":
     # Custom CSS for styling
     custom_css = """
@@ -278,7 +164,7 @@ if __name__ == "__main__":
     .stMarkdown p {
         color: #000000;
     }
-    .stButton > button {
+    .stButton > button, .stFormSubmitButton > button {
         background-color: #1F77B4;
         color: white;
         border: none;
@@ -289,7 +175,7 @@ if __name__ == "__main__":
         width: 100%;
         margin-bottom: 10px;
     }
-    .stButton > button:hover {
+    .stButton > button:hover, .stFormSubmitButton > button:hover {
         background-color: #155799;
     }
     .stTextInput > div > div > input {
@@ -369,17 +255,6 @@ if __name__ == "__main__":
     if st.sidebar.button("About", key="about_button"):
         st.session_state.page = "About"
 
-    # Memuat data dan inisialisasi
-    mf = "revisi_member_function.csv"
-    rules_file = "rules_bobot_respirasi.csv"
-    output_mf_file = "output_member_function.csv"
-
-    mf, cmap = load_membership_functions(mf)
-    rules = load_rules_with_weights(rules_file)
-    output_df = pd.read_csv(output_mf_file)
-    output_mf = {r['penyakit']: (r['a'], r['b'], r['c']) for _, r in output_df.iterrows()}
-    y_domain = np.linspace(0, 10, 1000)
-
     # Home Page
     if st.session_state.page == "Home":
         st.markdown("<div id='home'></div>", unsafe_allow_html=True)
@@ -448,6 +323,19 @@ if __name__ == "__main__":
 
     # Diagnosis Page
     elif st.session_state.page == "Diagnosis":
+        # Modul engine (numpy) dan knowledge base baru dimuat saat halaman ini dibuka,
+        # sehingga halaman statis tidak ikut menanggungnya
+        from fuzzy_engine import DEFUZZ_LABELS
+        from streamlit_engine import (live_diagnosis, load_knowledge_base, render_explanation, render_instrumentation,
+                                      render_pie_chart, run_diagnosis)
+
+        mf = "revisi_member_function.csv"
+        rules_file = "rules_bobot_respirasi.csv"
+        output_mf_file = "output_member_function.csv"
+
+        kb = load_knowledge_base(mf, rules_file, output_mf_file)
+        mf, cmap = kb.mf, kb.cmap
+
         st.title("Diagnosis Penyakit Respirasi Menggunakan Fuzzy Inference System")
         st.markdown(
     """
@@ -466,27 +354,35 @@ if __name__ == "__main__":
     unsafe_allow_html=True
 )
 
-        # Get User Inputs
-        inputs = get_user_inputs(mf, cmap)
-
-        # Perform Fuzzy Inference
-        if st.button("Diagnosis", key="diagnosis_run_button"):
-            z_star, per_disease, aggregated = fuzzy_inference_mamdani_weighted(inputs, mf, rules, output_mf, y_domain)
-            top3_result = get_top_diagnoses(per_disease, y_domain)
+        # Mode langsung (opsional): hasil diperbarui setiap input berubah, tanpa tombol
+        live = st.checkbox("Diagnosis langsung", key="live_diagnosis",
+                           help="Hasil diperbarui setiap kali nilai gejala diubah")
+
+        # Get User Inputs dan Perform Fuzzy Inference
+        # Tanpa mode langsung, semua input dikirim sekaligus lewat satu form:
+        # mengubah nilai tidak memicu rerun sampai tombol Diagnosis ditekan
+        top3_result = None
+        if live:
+            inputs = get_user_inputs(mf, cmap)
+            z_star, top3_result = live_diagnosis(inputs, kb)
+        else:
+            with st.form("symptom_form", border=False):
+                inputs = get_user_inputs(mf, cmap)
+                submitted = st.form_submit_button("Diagnosis", key="diagnosis_run_button")
+            if submitted:
+                z_star, top3_result = run_diagnosis(inputs, kb)
 
+        if top3_result is not None:
             # Display Results
             st.subheader("Hasil Diagnosis")
 
-            # Create DataFrame for Table - Only top 3
-            df = pd.DataFrame({
-                "Penyakit": [d for d, _, _ in top3_result],
-                "Kemungkinan (%)": [p for _, _, p in top3_result]
-            })
+            # Baris tabel top 3 (list biasa, tanpa pandas)
+            rows = [{"Penyakit": d, "Kemungkinan (%)": p} for d, _, p in top3_result]
 
             # Display Table and Chart in more compact layout
             col1, col2 = st.columns([1.2, 1])
             with col1:
-                for index, row in df.iterrows():
+                for row in rows:
                     st.markdown(
                         f"""
                             <div style='display: flex; align-items: center; justify-content: space-between; margin-bottom: 8px; background-color: rgba(255,255,255,0.1); padding: 12px; border-radius: 5px; font-size: 18px; font-weight: 500;'>
@@ -498,28 +394,16 @@ if __name__ == "__main__":
                     )
 
             with col2:
-                # Set figure with transparent background
-                fig, ax = plt.subplots(figsize=(5, 4), facecolor='none')
-                ax.pie(
-                    df["Kemungkinan (%)"],
-                    labels=df["Penyakit"],
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    colors=plt.cm.Blues(np.linspace(0.3, 0.8, len(df))),
-                    textprops={'color': 'black', 'fontsize': 9},
-                    labeldistance=0.6,  # Bring labels closer to center
-                    pctdistance=0.45,   # Bring percentages closer to center
-                )
-                ax.axis('equal')
-                
-                # Make plot background transparent
-                fig.patch.set_alpha(0.0)
-                ax.set_facecolor('none')
-                
-                # Add tight layout to remove extra whitespace
-                plt.tight_layout()
-                
-                st.pyplot(fig)
+                render_pie_chart([r["Penyakit"] for r in rows], [r["Kemungkinan (%)"] for r in rows])
+
+            # Perbandingan metode defuzzifikasi dari satu kurva agregasi yang sama
+            with st.expander("Nilai crisp per metode defuzzifikasi"):
+                cols = st.columns(len(z_star))
+                for col, (method, value) in zip(cols, z_star.items()):
+                    col.metric(DEFUZZ_LABELS[method], f"{value:.3f}")
+
+            render_explanation(inputs, kb, top3_result, label_map)
+            render_instrumentation()
 
     # Informasi Page
     elif st.session_state.page == "Informasi":
@@ -560,20 +444,8 @@ if __name__ == "__main__":
         """, unsafe_allow_html=True)
 
         # Tampilannya disini
-        for disease_key, info in DISEASE_INFO.items():
-            st.markdown(f"""
-            <div class="disease-card">
-                <div class="disease-title">{info['nama']}</div>
-                <div class="section-title">Deskripsi:</div>
-                <div class="info-text">{info['deskripsi']}</div>
-                <div class="section-title">Gejala Utama:</div>
-                <ul class="symptom-list">
-                    {''.join(f'<li class="info-text">{gejala}</li>' for gejala in info['gejala'])}
-                </ul>
-                <div class="section-title">Penanganan:</div>
-                <div class="info-text">{info['penanganan']}</div>
-            </div>
-            """, unsafe_allow_html=True)
+        for card in disease_cards():
+            st.markdown(card, unsafe_allow_html=True)
 
     # About Page
     elif st.session_state.page == "About":
@@ -1,8 +1,4 @@
 import streamlit as st
-import pandas as pd
-import ast
-import numpy as np
-import matplotlib.pyplot as plt
 
 # Ini adalah informasi penyakit yang akan ditampilkan
 DISEASE_INFO = {
@@ -76,53 +72,18 @@ DISEASE_INFO = {
 # Konfigurasi halaman harus menjadi command Streamlit pertama
 st.set_page_config(page_title="Respirazzy", page_icon="🩺", layout="wide")
 
-# --- 1. Memuat Fungsi Keanggotaan ---
-def load_membership_functions(path):
-    """
-    Memuat fungsi keanggotaan dari file CSV.
-    Returns:
-        mf: Dictionary fungsi keanggotaan
-        cmap: Pemetaan kategori gejala
-    """
-    df = pd.read_csv(path)
-    mf, cmap = {}, {}
-    for _, r in df.iterrows():
-        grp, g, setn = r['kategori'], r['Gejala'], r['Kategori']
-        a, c = r['first'], r['second']
-        b = (a + c) / 2.0
-        mf.setdefault(g, {})[setn] = (a, b, c)
-        cmap.setdefault(grp, set()).add(g)
-    return mf, cmap
-
-# --- 2. Memuat Aturan dengan Bobot ---
-def load_rules_with_weights(path):
-    """
-    Memuat aturan fuzzy dan bobotnya dari file CSV.
-    Returns:
-        rules: List tuple (kondisi, bobot, nama_penyakit)
-    """
-    df = pd.read_csv(path, dtype=str)
-    rules = []
-    for _, r in df.iterrows():
-        try:
-            conds = ast.literal_eval(r['vars'])
-            weights = list(map(float, ast.literal_eval(r['weights'])))
-        except Exception as e:
-            st.error(f"Error parsing rule for {r['nama_penyakit']}: {e}")
-            continue
-        if len(weights) != len(conds):
-            st.warning(f"Skipping rule {r['nama_penyakit']} due to length mismatch.")
-            continue
-        rules.append((conds, weights, r['nama_penyakit']))
-    return rules
-
-# --- 3. Input Gejala dari Pengguna ---
+# --- 1. Input Gejala dari Pengguna ---
 def get_user_inputs(mf, cmap):
     """
     Mengambil input gejala dari pengguna melalui antarmuka Streamlit.
     Returns:
         inp: Dictionary nilai input untuk setiap gejala
     """
+    from fuzzy_engine import membership_range
+
+    # Widget yang tidak dirender (misalnya saat pindah halaman) kehilangan nilainya,
+    # jadi nilai terakhir disimpan terpisah di session_state dan dipakai sebagai default
+    saved = st.session_state.get("symptom_values", {})
     inp = {}
     for grp, gs in cmap.items():
         st.subheader(f"{grp.title()}")
@@ -131,95 +92,38 @@ def get_user_inputs(mf, cmap):
         for i, g in enumerate(sorted(gs)):
             if g not in mf:
                 continue
-            pts = [p for (a, b, c) in mf[g].values() for p in (a, b, c)]
-            lo, hi = min(pts), max(pts)
+            lo, hi = membership_range(mf[g])
             default = (lo + hi) / 2
             step = 0.1 if hi - lo <= 10 else 0.5
             with cols[i % 4]:  # menentukan kolom berdasarkan indeks
                 with st.container():
                     st.markdown(f'<div style="background-color: #f0f2f6; border-radius: 10px; margin-bottom: 10px;">', unsafe_allow_html=True)
                     st.markdown(f"**{g.title()} ({lo:.1f}–{hi:.1f})**")
-                    value = st.number_input(label=f"{g}", min_value=lo, max_value=hi, value=default, step=step, key=g)
+                    value = st.number_input(label=f"{g}", min_value=lo, max_value=hi, value=saved.get(g, default), step=step, key=g)
                     inp[g] = value
                     st.markdown("</div>", unsafe_allow_html=True)
+    st.session_state.symptom_values = inp
     return inp
 
-# --- 4. Fungsi Pembantu ---
-def var_and_set_name(tok):
-    """Memisahkan nama variabel dan set dari token"""
-    parts = tok.split('_')
-    return '_'.join(parts[:-1]), parts[-1]
-
-def trimf(x, params):
-    """
-    Menghitung derajat keanggotaan fungsi segitiga.
-    Args:
-        x: Nilai input
-        params: Parameter fungsi segitiga (a,b,c)
-    Returns:
-        Derajat keanggotaan [0,1]
-    """
-    a, b, c = params
-    if a == b == c:
-        return 1.0 if x == a else 0.0
-    if x <= a or x >= c:
-        return 0.0
-    if x <= b:
-        return (x - a) / (b - a)
-    return (c - x) / (c - b)
-
-# --- 5. Inferensi Fuzzy dengan Bobot dan Pelacakan ---
-def fuzzy_inference_confidence_weighted_with_trace(inputs, mf, rules):
-    """
-    Melakukan inferensi fuzzy dengan bobot dan pelacakan proses.
-    Returns:
-        fuzzy_vals: Nilai fuzzy untuk setiap variabel
-        raw_degrees: Derajat keanggotaan mentah untuk setiap penyakit
-    """
-    fuzzy_vals = {}
-    for var, x in inputs.items():
-        fuzzy_vals[var] = {}
-        for setn, params in mf.get(var, {}).items():
-            mu = trimf(x, params)
-            fuzzy_vals[var][setn] = mu
-
-    raw_degrees = {}
-    for conds, weights, disease in rules:
-        base_strength = 0.0
-        match_count = 0
-        for c, w in zip(conds, weights):
-            var, setn = var_and_set_name(c)
-            mu = fuzzy_vals.get(var, {}).get(setn, 0.0)
-            if mu > 0:
-                match_count += 1
-            contrib = mu * w
-            base_strength += contrib
-        match_ratio = match_count / len(conds) if conds else 0
-        boosted_strength = base_strength * (1 + match_ratio)
-        raw_degrees[disease] = boosted_strength
-
-    return fuzzy_vals, raw_degrees
-
-# --- 6. Normalisasi N Teratas ---
-def normalize_top_n(raw_degrees, n=3):
-    """
-    Menormalisasi dan mengambil n hasil teratas.
-    Returns:
-        confidences: Dictionary persentase kepercayaan
-        top_n: List n penyakit teratas
-    """
-    sorted_raw = sorted(raw_degrees.items(), key=lambda x: -x[1])
-    top_n = [d for d, _ in sorted_raw][:n]
-    total_top = sum(raw_degrees[d] for d in top_n)
-    if total_top > 0:
-        return {
-            d: (raw_degrees[d] / total_top) * 100 if d in top_n else 0.0
-            for d in raw_degrees
-        }, top_n
-    else:
-        return {d: 0.0 for d in raw_degrees}, []
+# --- 2. Kartu Informasi Penyakit ---
+@st.cache_data(show_spinner=False)
+def disease_cards():
+    """HTML kartu setiap penyakit; dirakit sekali, lalu dipakai ulang oleh setiap rerun halaman Informasi."""
+    return [f"""
+            <div class="disease-card">
+                <div class="disease-title">{info['nama']}</div>
+                <div class="section-title">Deskripsi:</div>
+                <div class="info-text">{info['deskripsi']}</div>
+                <div class="section-title">Gejala Utama:</div>
+                <ul class="symptom-list">
+                    {''.join(f'<li class="info-text">{gejala}</li>' for gejala in info['gejala'])}
+                </ul>
+                <div class="section-title">Penanganan:</div>
+                <div class="info-text">{info['penanganan']}</div>
+            </div>
+            """ for info in DISEASE_INFO.values()]
 
-# --- 7. Program Utama ---
+# --- 3. Program Utama ---
 if __name__ == "__main__":
     # Custom CSS for styling
     custom_css = """
@@ -237,7 +141,7 @@ if __name__ == "__main__":
     .stMarkdown p {
         color: #000000;
     }
-    .stButton > button {
+    .stButton > button, .stFormSubmitButton > button {
         background-color: #1F77B4;
         color: white;
         border: none;
@@ -248,7 +152,7 @@ if __name__ == "__main__":
         width: 100%;
         margin-bottom: 10px;
     }
-    .stButton > button:hover {
+    .stButton > button:hover, .stFormSubmitButton > button:hover {
         background-color: #155799;
     }
     .stTextInput > div > div > input {
@@ -328,12 +232,6 @@ if __name__ == "__main__":
     if st.sidebar.button("About", key="about_button"):
         st.session_state.page = "About"
 
-    # Memuat data dan inisialisasi
-    mf_file = "revisi_member_function.csv"
-    rule_file = "rules_bobot_respirasi.csv"
-    mf, cmap = load_membership_functions(mf_file)
-    rules = load_rules_with_weights(rule_file)
-
     # Home Page
     if st.session_state.page == "Home":
         st.markdown("<div id='home'></div>", unsafe_allow_html=True)
@@ -402,30 +300,41 @@ if __name__ == "__main__":
 
     # Diagnosis Page
     elif st.session_state.page == "Diagnosis":
+        # Modul engine (numpy) dan knowledge base baru dimuat saat halaman ini dibuka,
+        # sehingga halaman statis tidak ikut menanggungnya
+        from fuzzy_engine import fuzzy_inference_confidence_weighted, normalize_top_n
+        from streamlit_engine import load_knowledge_base, render_pie_chart
+
+        mf_file = "revisi_member_function.csv"
+        rule_file = "rules_bobot_respirasi.csv"
+        output_mf_file = "output_member_function.csv"
+        kb = load_knowledge_base(mf_file, rule_file, output_mf_file)
+        mf, cmap, rules = kb.mf, kb.cmap, kb.rules.rules
+
         st.title("Diagnosis Penyakit Respirasi menggunakan Logika Fuzzy")
 
         # Get User Inputs
-        inputs = get_user_inputs(mf, cmap)
+        # Semua input dikirim sekaligus lewat satu form: mengubah nilai tidak
+        # memicu rerun sampai tombol Diagnosis ditekan
+        with st.form("symptom_form", border=False):
+            inputs = get_user_inputs(mf, cmap)
+            submitted = st.form_submit_button("Diagnosis", key="diagnosis_run_button")
 
         # Perform Fuzzy Inference
-        if st.button("Diagnosis", key="diagnosis_run_button"):
-            fuzzy_vals, raw_degrees = fuzzy_inference_confidence_weighted_with_trace(inputs, mf, rules)
+        if submitted:
+            fuzzy_vals, raw_degrees = fuzzy_inference_confidence_weighted(inputs, mf, rules)
             confidences, top3 = normalize_top_n(raw_degrees, n=3)
 
             # Display Results
             st.subheader("Hasil Diagnosis")
 
-            # Create DataFrame for Table - Only top 3
-            top3_data = {
-                "Penyakit": [disease for disease in top3],
-                "Kemungkinan (%)": [confidences[disease] for disease in top3]
-            }
-            df = pd.DataFrame(top3_data)
+            # Baris tabel top 3 (list biasa, tanpa pandas)
+            rows = [{"Penyakit": disease, "Kemungkinan (%)": confidences[disease]} for disease in top3]
 
             # Display Table and Chart in more compact layout
             col1, col2 = st.columns([1.2, 1])
             with col1:
-                for index, row in df.iterrows():
+                for row in rows:
                     st.markdown(
                         f"""
                         <div style='display: flex; align-items: center; margin-bottom: 5px; background-color: rgba(255,255,255,0.1); padding: 10px; border-radius: 5px;'>
@@ -437,28 +346,7 @@ if __name__ == "__main__":
                     )
 
             with col2:
-                # Set figure with transparent background
-                fig, ax = plt.subplots(figsize=(5, 4), facecolor='none')
-                ax.pie(
-                    df["Kemungkinan (%)"],
-                    labels=df["Penyakit"],
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    colors=plt.cm.Blues(np.linspace(0.3, 0.8, len(df))),
-                    textprops={'color': 'black', 'fontsize': 9},
-                    labeldistance=0.6,  # Bring labels closer to center
-                    pctdistance=0.45,   # Bring percentages closer to center
-                )
-                ax.axis('equal')
-                
-                # Make plot background transparent
-                fig.patch.set_alpha(0.0)
-                ax.set_facecolor('none')
-                
-                # Add tight layout to remove extra whitespace
-                plt.tight_layout()
-                
-                st.pyplot(fig)
+                render_pie_chart([r["Penyakit"] for r in rows], [r["Kemungkinan (%)"] for r in rows])
 
     # Informasi Page
     elif st.session_state.page == "Informasi":
@@ -499,20 +387,8 @@ if __name__ == "__main__":
         """, unsafe_allow_html=True)
 
         # Tampilannya disini
-        for disease_key, info in DISEASE_INFO.items():
-            st.markdown(f"""
-            <div class="disease-card">
-                <div class="disease-title">{info['nama']}</div>
-                <div class="section-title">Deskripsi:</div>
-                <div class="info-text">{info['deskripsi']}</div>
-                <div class="section-title">Gejala Utama:</div>
-                <ul class="symptom-list">
-                    {''.join(f'<li class="info-text">{gejala}</li>' for gejala in info['gejala'])}
-                </ul>
-                <div class="section-title">Penanganan:</div>
-                <div class="info-text">{info['penanganan']}</div>
-            </div>
-            """, unsafe_allow_html=True)
+        for card in disease_cards():
+            st.markdown(card, unsafe_allow_html=True)
 
     # About Page
     elif st.session_state.page == "About":
@@ -0,0 +1,195 @@
+import os
+
+import streamlit as st
+
+from fuzzy_engine import (INSTRUMENTATION, DiagnosisCache, IncrementalInference, diagnose, explain_rules,
+                          var_and_set_name)
+from knowledge_base import knowledge_base_version, load_knowledge_base_binary, load_knowledge_base_csv
+
+# --- 1. Knowledge Base (Cache Antar Rerun) ---
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cached_knowledge_base(mf_path, rules_path, output_mf_path, version):
+    return load_knowledge_base_csv(mf_path, rules_path, output_mf_path,
+                                   on_error=st.error, on_warning=st.warning, lut_step=0.1)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cached_binary_knowledge_base(path, version):
+    return load_knowledge_base_binary(path, lut_step=0.1)
+
+def load_knowledge_base(mf_path, rules_path, output_mf_path):
+    """
+    Memuat seluruh knowledge base sekali per proses dan dibagi ke semua sesi
+    dan semua aplikasi Streamlit. Versi file (knowledge_base_version) menjadi
+    bagian kunci cache, sehingga cache hanya diinvalidasi jika mtime atau isi
+    file CSV berubah. Baris rule yang rusak dilaporkan lewat st.error / st.warning.
+    Jika RESPIRAZZY_KB berisi path artefak biner (python knowledge_base.py out.kb),
+    artefak itu yang dipakai (mmap, tanpa parsing CSV maupun kompilasi rule),
+    untuk cold start replika baru yang lebih cepat.
+    Returns:
+        KnowledgeBase (mf, cmap, rules terkompilasi, output_mf, y_domain, version)
+    """
+    kb_path = os.environ.get("RESPIRAZZY_KB")
+    if kb_path:
+        return _cached_binary_knowledge_base(kb_path, knowledge_base_version(kb_path))
+    version = knowledge_base_version(mf_path, rules_path, output_mf_path)
+    return _cached_knowledge_base(mf_path, rules_path, output_mf_path, version)
+
+# --- 2. Cache Hasil Diagnosis ---
+@st.cache_resource(show_spinner=False)
+def get_diagnosis_cache():
+    """Cache hasil diagnosis (LRU) yang dibagi ke semua sesi dalam satu proses."""
+    return DiagnosisCache(maxsize=4096, step=0.1)
+
+def run_diagnosis(inputs, kb, method="all", n=3):
+    """
+    Diagnosis satu pasien lewat cache hasil bersama.
+    Returns:
+        z_star, top (lihat fuzzy_engine.diagnose)
+    """
+    return get_diagnosis_cache().get_or_compute(
+        inputs, (kb.version, method, n),
+        lambda: diagnose(inputs, kb.rules, kb.output_mf, kb.y_domain, method, n),
+    )
+
+# --- 2b. Diagnosis Langsung (State per Sesi) ---
+def live_diagnosis(inputs, kb, method="all", n=3):
+    """
+    Diagnosis yang diperbarui setiap kali input berubah. Setiap sesi
+    menyimpan IncrementalInference sendiri di st.session_state, sehingga
+    rerun hanya menghitung ulang gejala yang berubah. Top selalu keadaan
+    engine saat ini (mu dan alpha terbaru); st.session_state.live_shown
+    menyimpan penyakit dan persentase (dibulatkan ke 0.1) yang tampil di
+    kartu hasil, untuk front-end yang ingin melewati penggambaran ulang.
+    Returns:
+        z_star, top (lihat fuzzy_engine.diagnose)
+    """
+    state = st.session_state
+    engine = state.get("live_engine")
+    if (engine is None or state.get("live_version") != kb.version
+            or engine.method != method or engine.n != n):
+        engine = IncrementalInference(kb.rules, kb.output_mf, kb.y_domain, method=method, n=n)
+        state.live_engine = engine
+        state.live_version = kb.version
+        state.pop("live_shown", None)
+    engine.update_many(inputs)
+    z_star, top = engine.result()
+    state.live_shown = tuple((d, round(float(p), 1)) for d, _, p in top)
+    return z_star, top
+
+# --- 3. Penjelasan Diagnosis ---
+def explanation_sections(inputs, kb, top, label_map=None):
+    """
+    Isi panel penjelasan: untuk setiap penyakit teratas, judul rule
+    terkuatnya dan baris mu, bobot serta kontribusi setiap kondisi. Jejak
+    hanya dibangun untuk penyakit di top.
+    Returns:
+        List tuple (judul markdown, List Dictionary baris tabel)
+    """
+    label_map = label_map or {}
+    trace = explain_rules(inputs, kb.rules, [d for d, _, _ in top])
+    sections = []
+    for d, _, pct in top:
+        rules = trace.for_disease(d)
+        if not rules:
+            continue
+        best = rules[0]
+        title = (f"**{d.replace('_', ' ').title()}** ({pct:.1f}%): α = {best.strength:.3f}, "
+                 f"{best.matches}/{len(best.conditions)} gejala cocok")
+        rows = []
+        for c in best.conditions:
+            var, setn = var_and_set_name(c.condition)
+            rows.append({
+                "Gejala": label_map.get(var, var.replace("_", " ").title()),
+                "Tingkat": setn,
+                "Input": inputs.get(var),
+                "μ": round(c.mu, 3),
+                "Bobot": c.weight,
+                "Kontribusi": round(c.contribution, 3),
+            })
+        sections.append((title, rows))
+    return sections
+
+def render_explanation(inputs, kb, top, label_map=None):
+    """
+    Panel "mengapa diagnosis ini". Isinya disimpan di st.session_state
+    dengan kunci inputs dan top (termasuk mu), sehingga rerun tanpa
+    perubahan input (misalnya mode langsung saat widget lain berubah) tidak
+    menjalankan explain_rules lagi, sedangkan perubahan input apa pun,
+    walau persentasenya sama, membangunnya ulang.
+    """
+    state = st.session_state
+    key = (kb.version, tuple(sorted(inputs.items())), tuple(top))
+    cached = state.get("explanation")
+    if cached is None or cached[0] != key:
+        cached = (key, explanation_sections(inputs, kb, top, label_map))
+        state.explanation = cached
+    with st.expander("Mengapa diagnosis ini?"):
+        for title, rows in cached[1]:
+            st.markdown(title)
+            st.dataframe(rows, hide_index=True)
+
+# --- 4. Grafik Hasil Diagnosis ---
+@st.cache_data(show_spinner=False, max_entries=512)
+def _pie_chart_png(labels, values):
+    import io
+
+    import matplotlib
+    import numpy as np
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    # Figure tanpa pyplot: tidak terdaftar di state global, jadi tidak ada figure yang tertinggal
+    fig = Figure(figsize=(5, 4), facecolor='none')
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.pie(
+        values,
+        labels=labels,
+        autopct='%1.1f%%',
+        startangle=90,
+        colors=matplotlib.colormaps["Blues"](np.linspace(0.3, 0.8, len(values))),
+        textprops={'color': 'black', 'fontsize': 9},
+        labeldistance=0.6,
+        pctdistance=0.45,
+    )
+    ax.axis('equal')
+    fig.patch.set_alpha(0.0)
+    ax.set_facecolor('none')
+    fig.tight_layout()
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format="png", dpi=200, bbox_inches="tight", transparent=True)
+    finally:
+        fig.clear()
+    return buf.getvalue()
+
+def render_pie_chart(labels, values):
+    """
+    Pie chart hasil top-N sebagai PNG. Gambar dirender sekali per kombinasi
+    (label, persentase dibulatkan ke 0.01) lalu diambil dari st.cache_data,
+    sehingga klik Diagnosis berikutnya dengan hasil yang sama tidak membuat
+    figure matplotlib sama sekali. Tidak menggambar apa pun jika semua nilai nol.
+    """
+    values = tuple(round(float(v), 2) for v in values)
+    if not any(v > 0 for v in values):
+        st.info("Tidak ada rule yang cocok dengan gejala yang dimasukkan.")
+        return
+    st.image(_pie_chart_png(tuple(labels), values), width="stretch")
+
+# --- 5. Instrumentasi ---
+if os.environ.get("RESPIRAZZY_INSTRUMENT"):
+    INSTRUMENTATION.enable()
+
+def render_instrumentation():
+    """
+    Panel timer per tahap dan counter inferensi (kumulatif per proses).
+    Hanya tampil jika instrumentasi aktif, misalnya dengan RESPIRAZZY_INSTRUMENT=1.
+    """
+    if not INSTRUMENTATION.enabled:
+        return
+    snap = INSTRUMENTATION.snapshot()
+    with st.expander("Instrumentasi inferensi"):
+        st.dataframe([{"Tahap": name, **stats} for name, stats in snap["timings"].items()], hide_index=True)
+        counters = sorted(snap["counters"].items())
+        for col, (name, value) in zip(st.columns(max(len(counters), 1)), counters):
+            col.metric(name, value)